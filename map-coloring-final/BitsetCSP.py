@@ -0,0 +1,344 @@
+from array import array
+from typing import Dict, Hashable, Iterable, List, Optional
+from CSP import CSP
+
+
+
+class BitsetCSP(object):
+    """
+    Compact, integer-indexed core of a binary "different colors" CSP.
+
+    Variables and values are interned to dense integers. Every domain is an integer bitmask (bit i set means
+    value i is still possible), the constraint graph is stored as CSR arrays, and every domain change is pushed
+    on a trail so that undoing a search node costs O(changes) instead of rebuilding lists.
+
+    It is a separate engine, used by the minimum-colors search of chromatic.py and by LocalSearch; Solver keeps
+    the list domains of CSP. Solver handles constraints this core cannot express (equal, Table, Predicate and
+    plain functions over any values), and the domain lists are shared state: their order is the order in which
+    values are tried (LCV sorts them, portfolio restarts shuffle them), and kernel.py, components.py and
+    IncrementalColoring.py read and assign csp.variables directly.
+
+    Attributes:
+        variables (list): The original variable names, indexed by their integer id.
+        values (list): The original values, indexed by their bit position.
+        index (dict): Maps a variable name to its integer id.
+        value_index (dict): Maps a value to its bit position.
+        offsets (array): CSR row offsets; the neighbors of variable v are targets[offsets[v]:offsets[v + 1]].
+        targets (array): CSR column indices.
+        domains (array or list): The domain bitmask of every variable.
+        assigned (array): The assigned value index of every variable, -1 when unassigned.
+        assigned_count (int): The number of assigned variables.
+
+    Methods:
+        mark(): Returns a trail position that can later be passed to undo().
+        undo(mark): Reverts every domain change and assignment made since mark.
+        reset(mask): Unassigns everything and sets every domain to mask.
+        remove(variable, mask): Removes the values in mask from the domain of variable.
+        assign(variable, value): Assigns a value to a variable.
+        forward_check(variable, value): Removes value from the domains of the unassigned neighbors of variable.
+    """
+
+    def __init__(self, variables: List[Hashable], values: List, neighbors: List[Iterable[int]], domains: Optional[List[int]] = None) -> None:
+        """
+        Initializes a BitsetCSP object.
+
+        Args:
+            variables (list): The variable names; their position in the list is their integer id.
+            values (list): The values shared by all variables; their position in the list is their bit.
+            neighbors (list): For every variable id, the ids of the variables it must differ from.
+            domains (list, optional): Initial domain bitmask for every variable. Defaults to the full palette.
+        """
+        self.variables = list(variables)
+        self.values = list(values)
+        self.index = {var: i for i, var in enumerate(self.variables)}
+        self.value_index = {value: i for i, value in enumerate(self.values)}
+        self.full_mask = (1 << len(self.values)) - 1
+
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        for row in neighbors:
+            self.targets.extend(sorted(set(row)))
+            self.offsets.append(len(self.targets))
+
+        # Fixed-width storage as long as the palette fits in a machine word
+        if domains is None:
+            domains = [self.full_mask] * len(self.variables)
+        self.domains = array('Q', domains) if len(self.values) <= 64 else list(domains)
+        self.assigned = array('i', [-1]) * len(self.variables)
+        self.assigned_count = 0
+
+        # Trail of (variable, previous mask); assignments are recorded with variable encoded as ~variable
+        self.trail_vars = array('i')
+        self.trail_masks = array('Q') if len(self.values) <= 64 else []
+
+
+    @classmethod
+    def from_csp(cls, csp: CSP) -> "BitsetCSP":
+        """
+        Builds the bitset core from a CSP. Every binary constraint is interpreted as "values must differ",
+        which is the only constraint map coloring uses.
+
+        Args:
+            csp (CSP): The CSP to compile.
+
+        Returns:
+            BitsetCSP: The compiled core; current assignments of the CSP are carried over.
+        """
+        variables = list(csp.variables)
+        values = []
+        value_index = {}
+        for domain in csp.variables.values():
+            for value in domain:
+                if value not in value_index:
+                    value_index[value] = len(values)
+                    values.append(value)
+
+        index = {var: i for i, var in enumerate(variables)}
+        neighbors = [[] for _ in variables]
+        for var, constraints in csp.var_constraints.items():
+            if var not in index:
+                continue
+            for func, neighbor in constraints:
+                if neighbor in index:
+                    neighbors[index[var]].append(index[neighbor])
+
+        domains = []
+        for var in variables:
+            mask = 0
+            for value in csp.variables[var]:
+                mask |= 1 << value_index[value]
+            domains.append(mask)
+
+        core = cls(variables, values, neighbors, domains)
+        for var, value in csp.assignments.items():
+            if value is not None and var in index:
+                core.assign(index[var], value_index[value])
+        return core
+
+
+    @classmethod
+    def from_borders(cls, borders: Dict[str, List[str]], values: List) -> "BitsetCSP":
+        """
+        Builds the bitset core directly from a borders dictionary, skipping the CSP object entirely.
+
+        Args:
+            borders (dict): Maps each region to the regions it must differ from.
+            values (list): The palette shared by all regions.
+
+        Returns:
+            BitsetCSP: The compiled core.
+        """
+        variables = list(borders)
+        index = {var: i for i, var in enumerate(variables)}
+        neighbors = [[] for _ in variables]
+        for var, adjacent in borders.items():
+            for neighbor in adjacent:
+                if neighbor in index and neighbor != var:
+                    neighbors[index[var]].append(index[neighbor])
+                    neighbors[index[neighbor]].append(index[var])
+        return cls(variables, values, neighbors)
+
+
+
+    def with_values(self, values: List) -> "BitsetCSP":
+        """
+        Returns a new core over the same variables and constraint graph but a different palette. The CSR arrays
+        are shared, not copied.
+
+        Args:
+            values (list): The new palette.
+
+        Returns:
+            BitsetCSP: The new core, with every domain set to the full new palette.
+        """
+        core = BitsetCSP(self.variables, values, [])
+        core.offsets = self.offsets
+        core.targets = self.targets
+        return core
+
+
+
+    def neighbors(self, variable: int) -> array:
+        """
+        Returns the ids of the neighbors of a variable.
+
+        Args:
+            variable (int): The variable id.
+
+        Returns:
+            array: The neighbor ids.
+        """
+        return self.targets[self.offsets[variable]:self.offsets[variable + 1]]
+
+
+    def degree(self, variable: int) -> int:
+        """
+        Returns the number of neighbors of a variable.
+        """
+        return self.offsets[variable + 1] - self.offsets[variable]
+
+
+    def domain_size(self, variable: int) -> int:
+        """
+        Returns the number of values left in the domain of a variable.
+        """
+        return bin(self.domains[variable]).count('1')
+
+
+    def domain_values(self, variable: int) -> List[int]:
+        """
+        Returns the value indices left in the domain of a variable, in palette order.
+        """
+        mask = self.domains[variable]
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(low.bit_length() - 1)
+            mask ^= low
+        return result
+
+
+    def is_complete(self) -> bool:
+        """
+        Checks if all variables have been assigned.
+        """
+        return self.assigned_count == len(self.variables)
+
+
+
+    def reset(self, mask: Optional[int] = None) -> None:
+        """
+        Unassigns every variable, clears the trail and sets every domain to mask, so the same interned graph can
+        be searched again (for example with a smaller palette).
+
+        Args:
+            mask (int, optional): The new domain bitmask of every variable. Defaults to the full palette.
+
+        Returns:
+            None
+        """
+        if mask is None:
+            mask = self.full_mask
+        for i in range(len(self.variables)):
+            self.domains[i] = mask
+            self.assigned[i] = -1
+        self.assigned_count = 0
+        del self.trail_vars[:]
+        del self.trail_masks[:]
+
+
+    def mark(self) -> int:
+        """
+        Returns the current trail position.
+        """
+        return len(self.trail_vars)
+
+
+    def undo(self, mark: int) -> None:
+        """
+        Reverts every domain change and assignment recorded since mark.
+
+        Args:
+            mark (int): A trail position returned by mark().
+
+        Returns:
+            None
+        """
+        trail_vars = self.trail_vars
+        trail_masks = self.trail_masks
+        while len(trail_vars) > mark:
+            var = trail_vars.pop()
+            old = trail_masks.pop()
+            if var < 0:
+                self.assigned[~var] = old - 1
+                self.assigned_count -= 1
+            else:
+                self.domains[var] = old
+
+
+    def remove(self, variable: int, mask: int) -> bool:
+        """
+        Removes the values in mask from the domain of a variable, recording the change on the trail.
+
+        Args:
+            variable (int): The variable id.
+            mask (int): Bitmask of the values to remove.
+
+        Returns:
+            bool: False if the domain became empty, True otherwise.
+        """
+        old = self.domains[variable]
+        new = old & ~mask
+        if new != old:
+            self.trail_vars.append(variable)
+            self.trail_masks.append(old)
+            self.domains[variable] = new
+        return new != 0
+
+
+    def assign(self, variable: int, value: int) -> bool:
+        """
+        Assigns a value to a variable and reduces its domain to that single value.
+
+        Args:
+            variable (int): The variable id.
+            value (int): The value index.
+
+        Returns:
+            bool: True if the value was in the domain and the variable was unassigned, False otherwise.
+        """
+        bit = 1 << value
+        if self.assigned[variable] != -1 or not self.domains[variable] & bit:
+            return False
+        # Old assignment is stored shifted by one so that the trail stays unsigned
+        self.trail_vars.append(~variable)
+        self.trail_masks.append(self.assigned[variable] + 1)
+        self.assigned[variable] = value
+        self.assigned_count += 1
+        self.remove(variable, self.domains[variable] & ~bit)
+        return True
+
+
+    def is_consistent(self, variable: int, value: int) -> bool:
+        """
+        Checks that no assigned neighbor of variable holds value.
+        """
+        assigned = self.assigned
+        for i in range(self.offsets[variable], self.offsets[variable + 1]):
+            if assigned[self.targets[i]] == value:
+                return False
+        return True
+
+
+    def forward_check(self, variable: int, value: int) -> bool:
+        """
+        Removes value from the domains of the unassigned neighbors of a variable.
+
+        Args:
+            variable (int): The variable id that has just been assigned.
+            value (int): The value index assigned to it.
+
+        Returns:
+            bool: False as soon as a neighbor's domain becomes empty, True otherwise.
+        """
+        bit = 1 << value
+        assigned = self.assigned
+        domains = self.domains
+        for i in range(self.offsets[variable], self.offsets[variable + 1]):
+            neighbor = self.targets[i]
+            if assigned[neighbor] == -1 and domains[neighbor] & bit:
+                if not self.remove(neighbor, bit):
+                    return False
+        return True
+
+
+
+    def assignments(self) -> Dict:
+        """
+        Translates the current assignment back to the original variable names and values.
+
+        Returns:
+            dict: Maps every variable name to its value, or None when unassigned.
+        """
+        return {var: (self.values[self.assigned[i]] if self.assigned[i] != -1 else None)
+                for i, var in enumerate(self.variables)}
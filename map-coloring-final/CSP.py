@@ -1,5 +1,6 @@
 from collections import deque
 from typing import Callable, List, Tuple
+from constraints import AllDifferent, BinaryConstraint, NaryConstraint, Predicate, not_equal
 
 
 
@@ -16,6 +17,10 @@ class CSP(object):
     Methods:
         add_constraint(constraint_func, variables): Adds a constraint to the CSP.
         add_variable(variable, domain): Adds a variable to the CSP with its domain.
+        remove_constraint(variables): Removes the constraints between two variables.
+        remove_variable(variable): Removes a variable and its constraints.
+        compact_constraints(): Drops the arcs of removed constraints from constraints.
+        add_unassigned(variable), remove_unassigned(variable): Keep unassigned_var and its index map in sync.
     """
 
     def __init__(self, *args, **kwargs) -> None:
@@ -32,6 +37,12 @@ class CSP(object):
             unassigned_var (list): A list to store the unassigned variables of the CSP.
             var_constraints (dict): A dictionary to store the constraints associated with each variable.
             assignments (dict): A dictionary to store the assignments of the CSP.
+            nary_constraints (list): The (constraint, variables) pairs of the constraints over more than two variables.
+            var_nary (dict): Maps each variable to the indices of its constraints in nary_constraints.
+            unassigned_position (dict): Maps each unassigned variable to its index in unassigned_var, so that assign
+                removes it in O(1) by moving the last variable into its place.
+            saved_domains (dict): The domain every variable assigned by assign had before, which unassign puts back
+                instead of appending the removed values one by one.
         """
         self.borders = {**kwargs}
         
@@ -41,6 +52,10 @@ class CSP(object):
         self.var_constraints = {}
         self.assignments = {}
         self.assignments_number = 0
+        self.nary_constraints = []
+        self.var_nary = {}
+        self.unassigned_position = {}
+        self.saved_domains = {}
     
         
         
@@ -53,6 +68,12 @@ class CSP(object):
         """
         Adds a constraint to the CSP.
 
+        Binary constraints are stored for both variables in var_constraints. Typed constraints from constraints.py
+        (not_equal, equal, Table) let the solver use list and bit operations instead of calling a function per pair
+        of values; a Table is stored reversed for the second variable. Constraints over more than two variables (or
+        any NaryConstraint) are stored in nary_constraints: not_equal or AllDifferent over several variables becomes
+        an AllDifferent, any other function a Predicate called with one value per variable.
+
         Args:
             constraint_func (function): The constraint function to be added.
             variables (list): The variables involved in the constraint.
@@ -60,6 +81,14 @@ class CSP(object):
         Returns:
             None
         """
+        if len(variables) > 2 or isinstance(constraint_func, NaryConstraint):
+            self.add_nary_constraint(constraint_func, variables)
+            return
+        if isinstance(constraint_func, BinaryConstraint):
+            x, y = variables
+            self.var_constraints.setdefault(x, []).append((constraint_func, y))
+            self.var_constraints.setdefault(y, []).append((constraint_func.reversed(), x))
+            return
         for var in variables:
             if var in self.var_constraints:
                 self.var_constraints[var].append((constraint_func,[i for i in variables if i!=var][0]))
@@ -67,6 +96,114 @@ class CSP(object):
                 self.var_constraints[var] = [(constraint_func,[i for i in variables if i!=var][0])]
 
 
+    def add_nary_constraint(self, constraint_func: Callable, variables: List[str]) -> None:
+        """
+        Adds a constraint over any number of variables.
+
+        An AllDifferent is also posted as not_equal arcs between every pair of its variables, so that every search
+        option propagates it; the solver adds its pigeonhole test on top.
+
+        Args:
+            constraint_func (function): An NaryConstraint, not_equal (all different), or a function called with one
+                value per variable.
+            variables (list): The variables involved in the constraint.
+
+        Returns:
+            None
+        """
+        if isinstance(constraint_func, NaryConstraint):
+            constraint = constraint_func
+        elif constraint_func is not_equal:
+            constraint = AllDifferent()
+        else:
+            constraint = Predicate(constraint_func)
+        variables = tuple(variables)
+        for var in variables:
+            self.var_nary.setdefault(var, []).append(len(self.nary_constraints))
+        self.nary_constraints.append((constraint, variables))
+
+        if constraint.kind == "all_different":
+            for i, x in enumerate(variables):
+                for y in variables[i + 1:]:
+                    if not any(func is not_equal and other == y for func, other in self.var_constraints.get(x, [])):
+                        self.add_constraint(not_equal, [x, y])
+
+
+    def remove_constraint(self, variables: List[str]) -> None:
+        """
+        Removes every binary constraint between two variables in O(their degrees). Their arcs are left in
+        constraints, where the solver skips them, until compact_constraints is called.
+
+        Args:
+            variables (list): The two variables.
+
+        Returns:
+            None
+        """
+        x, y = variables
+        for var, other in ((x, y), (y, x)):
+            constraints = [(func, neighbor) for func, neighbor in self.var_constraints.get(var, []) if neighbor != other]
+            if constraints:
+                self.var_constraints[var] = constraints
+            else:
+                self.var_constraints.pop(var, None)
+
+
+    def remove_variable(self, variable: str) -> None:
+        """
+        Removes a variable, its binary constraints, and its place in the AllDifferent constraints it belongs to. As
+        in remove_constraint, its arcs are left in constraints.
+
+        Args:
+            variable (str): The variable to remove.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the variable belongs to an n-ary constraint other than AllDifferent, which cannot be
+                restricted to the remaining variables.
+        """
+        indices = self.var_nary.get(variable, ())
+        if any(self.nary_constraints[index][0].kind != "all_different" for index in indices):
+            raise ValueError("%s belongs to a constraint that cannot be restricted to the other variables" % variable)
+        for func, neighbor in self.var_constraints.pop(variable, []):
+            constraints = [(func, other) for func, other in self.var_constraints.get(neighbor, []) if other != variable]
+            if constraints:
+                self.var_constraints[neighbor] = constraints
+            else:
+                self.var_constraints.pop(neighbor, None)
+        if indices:
+            nary_constraints = self.nary_constraints
+            self.nary_constraints = []
+            self.var_nary = {}
+            for constraint, variables in nary_constraints:
+                variables = tuple(var for var in variables if var != variable)
+                if len(variables) > 1:
+                    for var in variables:
+                        self.var_nary.setdefault(var, []).append(len(self.nary_constraints))
+                    self.nary_constraints.append((constraint, variables))
+        del self.variables[variable]
+        del self.assignments[variable]
+        self.saved_domains.pop(variable, None)
+        if variable in self.unassigned_var:
+            self.remove_unassigned(variable)
+
+
+    def compact_constraints(self) -> None:
+        """
+        Rebuilds the arc list from var_constraints in O(size of the CSP), dropping the arcs left behind by
+        remove_constraint and remove_variable and the duplicates of constraints added twice. An empty arc list
+        (AC-3 not used) stays empty.
+
+        Returns:
+            None
+        """
+        if self.constraints:
+            self.constraints = list(dict.fromkeys((var, other) for var in self.variables
+                                                  for func, other in self.var_constraints.get(var, [])))
+
+
     def add_variable(self, variable: str, domain: List) -> None:  ##okay
         """
         Adds a variable to the CSP with its domain.
@@ -80,7 +217,7 @@ class CSP(object):
         """
         self.variables[variable] = domain
         #print( self.variables, self.variables[variable])
-        self.unassigned_var.append(variable)
+        self.add_unassigned(variable)
         self.assignments[variable] = None
         #print(self.unassigned_var)
   
@@ -103,9 +240,10 @@ class CSP(object):
             # if value not in ['red', 'green', 'blue', 'yellow']:
             #     print(type(value))
             #print(self.assignments[variable])
-            self.unassigned_var.remove(variable)
+            self.remove_unassigned(variable)
             self.assignments_number += 1
             
+            self.saved_domains[variable] = self.variables[variable]
             self.variables[variable] = [value]
    
             
@@ -127,11 +265,23 @@ class CSP(object):
             bool: True if the assignment is consistent with the constraints, False otherwise.
         """
         constraints = self.var_constraints.get(variable, [])
-        print(variable, constraints)
+        assignments = self.assignments
         for constraint in constraints:
-            if self.assignments[constraint[1]] != None :
-                if not constraint[0](self.assignments[constraint[1]],value):
+            other_value = assignments[constraint[1]]
+            if other_value != None :
+                if constraint[0] is not_equal:
+                    if other_value == value:
+                        return False
+                elif not constraint[0](other_value,value):
                     return False
+        for index in self.var_nary.get(variable, ()):
+            constraint, variables = self.nary_constraints[index]
+            # AllDifferent is already checked through its not_equal arcs
+            if constraint.kind == "all_different":
+                continue
+            values = [value if var == variable else assignments[var] for var in variables]
+            if None not in values and not constraint.check(values):
+                return False
         return True
 
 
@@ -159,6 +309,73 @@ class CSP(object):
         return self.assignments[variable] != None
 
 
+    def add_unassigned(self, variable: str) -> None:
+        """
+        Appends a variable to unassigned_var, recording its position.
+        """
+        self.unassigned_position[variable] = len(self.unassigned_var)
+        self.unassigned_var.append(variable)
+
+
+    def remove_unassigned(self, variable: str) -> None:
+        """
+        Removes a variable from unassigned_var in O(1): the last variable takes its place. The order of
+        unassigned_var is therefore not meaningful.
+
+        Args:
+            variable (str): The unassigned variable to remove.
+
+        Returns:
+            None
+        """
+        unassigned = self.unassigned_var
+        position = self.unassigned_position
+        index = position.get(variable)
+        if index is None or index >= len(unassigned) or unassigned[index] != variable:
+            # unassigned_var was replaced or edited directly (components, kernel, local search): index it again
+            position.clear()
+            position.update((var, i) for i, var in enumerate(unassigned))
+            index = position[variable]
+        last = unassigned.pop()
+        if last != variable:
+            unassigned[index] = last
+            position[last] = index
+        del position[variable]
+
+
+    def subproblem(self, variables: List[str]) -> "CSP":
+        """
+        Creates a new CSP restricted to the given variables: their domains (copied), current assignments and the
+        constraints between them. Constraints with variables outside the list are dropped, so the list should be
+        closed under the constraint graph (for example a connected component).
+
+        Args:
+            variables (list): The variables to keep.
+
+        Returns:
+            CSP: The restricted problem.
+        """
+        keep = set(variables)
+        csp = CSP(**self.borders)
+        for var in variables:
+            csp.variables[var] = list(self.variables[var])
+            csp.assignments[var] = self.assignments[var]
+            if self.assignments[var] is None:
+                csp.add_unassigned(var)
+            constraints = [(func, other) for func, other in self.var_constraints.get(var, []) if other in keep]
+            if constraints:
+                csp.var_constraints[var] = constraints
+        for constraint, nary_variables in self.nary_constraints:
+            if all(var in keep for var in nary_variables):
+                for var in nary_variables:
+                    csp.var_nary.setdefault(var, []).append(len(csp.nary_constraints))
+                csp.nary_constraints.append((constraint, nary_variables))
+        if self.constraints:
+            # Rebuilt from the kept constraints in O(size of the subproblem) rather than filtering every arc
+            csp.constraints = [(var, other) for var in variables for func, other in csp.var_constraints.get(var, [])]
+        return csp
+
+
     def unassign(self, removed_values_from_domain: List[Tuple[str, any]], variable: str) -> None:
         """
         Unassign a variable and restores its domain values.
@@ -173,13 +390,17 @@ class CSP(object):
         if self.is_assigned(variable):
             
             self.assignments[variable] = None
-            self.unassigned_var.append(variable)
+            self.add_unassigned(variable)
             
             # print("\n\nAssigning variable : ", variable)
-            #Domain recovery
+            #Domain recovery: the variable's own domain comes back whole, in its order, from saved_domains
+            domain = self.saved_domains.pop(variable, None)
+            if domain is not None:
+                self.variables[variable] = domain
             for var, value in removed_values_from_domain:
                 # print(var, " : " , value, end=' ,')
-                self.variables[var].append(value)                      
+                if var != variable or domain is None:
+                    self.variables[var].append(value)                      
             # print()
             
             # self.variables[variable].append(value)
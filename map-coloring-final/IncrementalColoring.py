@@ -0,0 +1,349 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Union
+from CSP import CSP, not_equal
+from constraints import BinaryConstraint
+from Solver import Solver
+
+
+
+class IncrementalColoring(object):
+    """
+    Keeps a CSP solved while borders and regions are added and removed.
+
+    Removing a border or a region never breaks a coloring, so it only updates the CSP. After an insertion the
+    touched regions are repaired locally, trying in turn:
+        1. a value of the palette none of the neighbors holds;
+        2. a Kempe chain swap: exchanging two colors b and c on the connected b/c-colored region around the
+           b-colored neighbors frees b, as long as the chain reaches no c-colored neighbor;
+        3. a bounded re-search of the regions within 1..radius borders of the unresolved ones, the regions outside
+           keeping their values;
+        4. a full solve, only if everything else failed.
+    Steps 1 to 3 cost time proportional to the neighborhood they explore, not to the size of the map.
+
+    Kempe swaps are only sound when every constraint means "values must differ" (not_equal, plain constraint
+    functions as in map coloring, AllDifferent); with other constraints step 2 is skipped.
+
+    Attributes:
+        csp (CSP): The solved problem, updated in place.
+        palette (dict): The full domain of every variable (the domains of a solved CSP only hold the assigned value).
+        stats (dict): Number of regions repaired by each step (free, kempe, local) and of full solves.
+    """
+
+    def __init__(self, csp: CSP, palette: Union[List, Dict[str, List]], solver_options: Optional[Dict] = None,
+                 radius: int = 3, max_chain: int = 100, max_nodes: int = 10000) -> None:
+        """
+        Initializes an IncrementalColoring object, solving the CSP first if it is not complete.
+
+        Args:
+            csp (CSP): The problem, usually already solved.
+            palette (list or dict): The values every variable may take, shared or per variable.
+            solver_options (dict, optional): Keyword arguments of the Solver used by the local re-search and the
+                full solve. Defaults to DSATUR with forward checking.
+            radius (int, optional): Largest number of borders around the unresolved regions re-searched before
+                falling back to a full solve. Defaults to 3.
+            max_chain (int, optional): Largest Kempe chain that is swapped; longer chains are left to the local
+                re-search, which is cheaper than walking a chain spanning the whole map. Defaults to 100.
+            max_nodes (int, optional): Assignment budget of every local re-search. Defaults to 10000.
+        """
+        self.csp = csp
+        self.shared_palette = list(palette) if not isinstance(palette, dict) else None
+        self.palette = dict(palette) if isinstance(palette, dict) else {}
+        for var in csp.variables:
+            self.domain(var)
+        self.solver_options = solver_options if solver_options is not None else {"DSATUR": True, "forward_checking": True}
+        self.radius = radius
+        self.max_chain = max_chain
+        self.max_nodes = max_nodes
+        self.stats = {"free": 0, "kempe": 0, "local": 0, "full": 0}
+        # Arcs of removed borders still in csp.constraints; compacted once they are half of the list
+        self.stale_arcs = 0
+        self.differ_only = self.kempe_allowed()
+        if not csp.is_complete():
+            self.full_solve()
+
+
+    def domain(self, var) -> List:
+        """
+        Returns the full domain of a variable, recording the shared palette for new variables.
+        """
+        if var not in self.palette:
+            if self.shared_palette is None:
+                raise ValueError("no domain was given for %s" % var)
+            self.palette[var] = list(self.shared_palette)
+        return self.palette[var]
+
+
+    def kempe_allowed(self) -> bool:
+        """
+        Checks whether every constraint of the CSP means "values must differ", which Kempe swaps require. Computed
+        once; add_border keeps it up to date.
+        """
+        if any(constraint.kind != "all_different" for constraint, variables in self.csp.nary_constraints):
+            return False
+        return all(not isinstance(func, BinaryConstraint) or func is not_equal
+                   for constraints in self.csp.var_constraints.values() for func, neighbor in constraints)
+
+
+    def neighbors(self, var) -> List:
+        """
+        Returns the distinct variables constrained with var.
+        """
+        return list(dict.fromkeys(neighbor for func, neighbor in self.csp.var_constraints.get(var, []) if neighbor != var))
+
+
+    def set_value(self, var, value) -> None:
+        # Assigns var directly, keeping the CSP's solved representation (singleton domain)
+        csp = self.csp
+        if csp.assignments[var] is None:
+            csp.remove_unassigned(var)
+        csp.assignments[var] = value
+        csp.variables[var] = [value]
+
+
+    def clear(self, var) -> None:
+        # Unassigns var and gives it back its full domain
+        csp = self.csp
+        if csp.assignments[var] is not None:
+            csp.assignments[var] = None
+            csp.add_unassigned(var)
+        csp.variables[var] = list(self.domain(var))
+
+
+    def add_border(self, x, y, constraint_func=not_equal) -> bool:
+        """
+        Adds a constraint between two regions and repairs the coloring if they now conflict.
+
+        Args:
+            x: The first region.
+            y: The second region.
+            constraint_func (function, optional): The constraint. Defaults to not_equal.
+
+        Returns:
+            bool: True if the CSP is solved again.
+        """
+        csp = self.csp
+        constraints = csp.var_constraints.get(x, [])
+        if not any(func is constraint_func and other == y for func, other in constraints):
+            bordered = any(other == y for func, other in constraints)
+            csp.add_constraint(constraint_func, [x, y])
+            if isinstance(constraint_func, BinaryConstraint) and constraint_func is not not_equal:
+                self.differ_only = False
+            # AC-3 only needs one arc per direction, whatever the number of constraints between x and y
+            if csp.constraints and not bordered:
+                csp.constraints.extend([(x, y), (y, x)])
+        if csp.is_consistent(x, csp.assignments[x]):
+            return True
+        # Recolor the region with fewer neighbors, which is the easier one to move
+        var = min((x, y), key=lambda v: len(csp.var_constraints.get(v, [])))
+        return self.repair([var])
+
+
+    def remove_border(self, x, y) -> bool:
+        """
+        Removes the constraints between two regions; the coloring stays valid.
+        """
+        if any(other == y for func, other in self.csp.var_constraints.get(x, [])):
+            self.csp.remove_constraint([x, y])
+            self.arcs_removed(2)
+        return True
+
+
+    def add_region(self, var, neighbors: Iterable, domain: Optional[List] = None) -> bool:
+        """
+        Adds a region bordering the given regions (with not_equal constraints) and colors it.
+
+        Args:
+            var: The new region.
+            neighbors (iterable): The regions it borders.
+            domain (list, optional): Its values. Defaults to the shared palette.
+
+        Returns:
+            bool: True if the CSP is solved again.
+        """
+        csp = self.csp
+        if domain is not None:
+            self.palette[var] = list(domain)
+        csp.add_variable(var, list(self.domain(var)))
+        for neighbor in dict.fromkeys(neighbors):
+            if neighbor != var:
+                csp.add_constraint(not_equal, [var, neighbor])
+                if csp.constraints:
+                    csp.constraints.extend([(var, neighbor), (neighbor, var)])
+        return self.repair([var])
+
+
+    def remove_region(self, var) -> bool:
+        """
+        Removes a region and its borders; the coloring of the other regions stays valid.
+        """
+        arcs = 2 * len(self.neighbors(var))
+        self.csp.remove_variable(var)
+        self.palette.pop(var, None)
+        self.arcs_removed(arcs)
+        return True
+
+
+    def arcs_removed(self, count: int) -> None:
+        # Counts the arcs left behind in csp.constraints and compacts the list when they make up half of it, so
+        # its length stays proportional to the number of borders at O(1) amortized cost per removal
+        self.stale_arcs += count
+        if self.stale_arcs * 2 > len(self.csp.constraints):
+            self.csp.compact_constraints()
+            self.stale_arcs = 0
+
+
+    def free_value(self, var) -> Optional[object]:
+        """
+        Returns a value of the palette of var consistent with its assigned neighbors, or None.
+        """
+        for value in self.domain(var):
+            if self.csp.is_consistent(var, value):
+                return value
+        return None
+
+
+    def kempe(self, var) -> bool:
+        """
+        Tries to free a value for the unassigned variable var with one Kempe chain swap per value.
+        """
+        csp = self.csp
+        assignments = csp.assignments
+        neighbors = self.neighbors(var)
+        colors = self.domain(var)
+        for b in colors:
+            b_neighbors = [n for n in neighbors if assignments[n] == b]
+            for c in colors:
+                if c == b:
+                    continue
+                c_neighbors = {n for n in neighbors if assignments[n] == c}
+                chain = self.kempe_chain(b_neighbors, b, c, var)
+                if chain is None or chain & c_neighbors:
+                    continue
+                for region in chain:
+                    self.set_value(region, c if assignments[region] == b else b)
+                self.set_value(var, b)
+                csp.assignments_number += len(chain) + 1
+                return True
+        return False
+
+
+    def kempe_chain(self, start: List, b, c, var) -> Optional[Set]:
+        """
+        Returns the b/c-colored regions connected to start (not going through var), or None if the chain is longer
+        than max_chain or contains a region that cannot take both values.
+        """
+        assignments = self.csp.assignments
+        chain = set(start)
+        queue = deque(start)
+        while queue:
+            region = queue.popleft()
+            domain = self.domain(region)
+            if b not in domain or c not in domain:
+                return None
+            for neighbor in self.neighbors(region):
+                if neighbor != var and neighbor not in chain and assignments[neighbor] in (b, c):
+                    chain.add(neighbor)
+                    if len(chain) > self.max_chain:
+                        return None
+                    queue.append(neighbor)
+        return chain
+
+
+    def ball(self, variables: List, radius: int) -> List:
+        """
+        Returns the variables within radius borders of the given ones.
+        """
+        distance = {var: 0 for var in variables}
+        queue = deque(variables)
+        while queue:
+            var = queue.popleft()
+            if distance[var] == radius:
+                continue
+            for neighbor in self.neighbors(var):
+                if neighbor not in distance:
+                    distance[neighbor] = distance[var] + 1
+                    queue.append(neighbor)
+        return list(distance)
+
+
+    def local_search(self, variables: List) -> bool:
+        """
+        Re-solves the regions within 1, 2, ... radius borders of the unassigned variables, the other regions keeping
+        their values, and stores the first solution found.
+        """
+        csp = self.csp
+        for radius in range(1, self.radius + 1):
+            region = self.ball(variables, radius)
+            inside = set(region)
+            previous = {var: csp.assignments[var] for var in region}
+            for var in region:
+                self.clear(var)
+            # Values conflicting with the regions outside the ball are removed before the search
+            for var in region:
+                csp.variables[var] = [value for value in self.domain(var)
+                                      if all(other in inside or csp.assignments[other] is None or func(csp.assignments[other], value)
+                                             for func, other in csp.var_constraints.get(var, []))]
+            subproblem = csp.subproblem(region)
+            solver = Solver(csp=subproblem, **self.solver_options)
+            result = solver.iterative_solver(max_nodes=self.max_nodes)
+            csp.assignments_number += subproblem.assignments_number
+            if result is not None:
+                for var in region:
+                    self.set_value(var, result[var])
+                # n-ary constraints reaching outside the ball were not part of the subproblem
+                if all(csp.is_consistent(var, csp.assignments[var]) for var in region):
+                    return True
+            for var in region:
+                if previous[var] is None:
+                    self.clear(var)
+                else:
+                    self.set_value(var, previous[var])
+        return False
+
+
+    def full_solve(self) -> bool:
+        """
+        Solves the whole CSP again from its full domains.
+        """
+        csp = self.csp
+        for var in csp.variables:
+            self.clear(var)
+        if self.stale_arcs:
+            csp.compact_constraints()
+            self.stale_arcs = 0
+        solver = Solver(csp=csp, **self.solver_options)
+        result = solver.iterative_solver()
+        self.stats["full"] += 1
+        return result is not None
+
+
+    def repair(self, variables: List) -> bool:
+        """
+        Recolors the given variables, changing as few other values as possible.
+
+        Args:
+            variables (list): The variables to recolor; their current values are discarded.
+
+        Returns:
+            bool: True if the CSP is solved again, False if it has no solution.
+        """
+        for var in variables:
+            self.clear(var)
+        unresolved = []
+        for var in variables:
+            value = self.free_value(var)
+            if value is not None:
+                self.set_value(var, value)
+                self.csp.assignments_number += 1
+                self.stats["free"] += 1
+                continue
+            if self.differ_only and self.kempe(var):
+                self.stats["kempe"] += 1
+                continue
+            unresolved.append(var)
+        if not unresolved:
+            return True
+        if self.local_search(unresolved):
+            self.stats["local"] += len(unresolved)
+            return True
+        return self.full_solve()
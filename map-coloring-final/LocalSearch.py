@@ -0,0 +1,252 @@
+import random
+import time
+from array import array
+from heapq import heappop, heappush
+from typing import Dict, Optional
+from CSP import CSP, not_equal
+from BitsetCSP import BitsetCSP
+from constraints import BinaryConstraint
+
+
+
+class LocalSearch(object):
+    """
+    Min-conflicts local search with a tabu list and random walk, for coloring maps too large for systematic search.
+
+    The search starts from a greedy DSATUR coloring restricted to the domains, then repeatedly recolors a vertex
+    that has a conflict. For every vertex and value the number of neighbors holding that value is kept in a flat
+    array, so a move costs O(degree) and choosing the best value for a vertex costs O(domain). Recently abandoned
+    (vertex, value) pairs are tabu for a few iterations unless taking them would beat the best coloring so far.
+
+    Only "values must differ" constraints are supported: not_equal, plain constraint functions (which are assumed
+    to mean it, as in map coloring) and AllDifferent. Assigned variables of the CSP keep their value.
+
+    Attributes:
+        csp (CSP): The problem to solve; the solution is stored in it.
+        core (BitsetCSP): The interned constraint graph and domains.
+        colors (array): The current value index of every vertex.
+        counts (array): counts[v * k + c] is the number of neighbors of v holding value c.
+        conflicts (int): The number of conflicting edges of the current coloring.
+        best_conflicts (int): The fewest conflicting edges seen so far.
+        iterations (int): The number of moves made.
+        stopped (bool): Whether the last run ended because its budget ran out.
+    """
+
+    def __init__(self, csp: CSP, walk_probability: float = 0.02, tabu_tenure: int = 10, seed: Optional[int] = None) -> None:
+        """
+        Initializes a LocalSearch object.
+
+        Args:
+            csp (CSP): The problem to solve.
+            walk_probability (float, optional): Probability of recoloring the chosen vertex with a random value
+                instead of the best one. Defaults to 0.02.
+            tabu_tenure (int, optional): Base number of iterations a vertex may not take back the value it left;
+                a random amount of up to as many iterations again is added. Defaults to 10.
+            seed (int, optional): Seed of the random choices. Defaults to a random seed.
+
+        Raises:
+            ValueError: If the CSP has constraints other than "values must differ" or an empty domain.
+        """
+        for var, constraints in csp.var_constraints.items():
+            for func, neighbor in constraints:
+                if isinstance(func, BinaryConstraint) and func is not not_equal:
+                    raise ValueError("local search only supports not_equal constraints, %s has %s" % (var, func.kind))
+        for constraint, variables in csp.nary_constraints:
+            if constraint.kind != "all_different":
+                raise ValueError("local search only supports AllDifferent among n-ary constraints, not %s" % constraint.kind)
+
+        self.csp = csp
+        self.core = BitsetCSP.from_csp(csp)
+        self.walk_probability = walk_probability
+        self.tabu_tenure = tabu_tenure
+        self.random = random.Random(seed)
+        self.k = len(self.core.values)
+        self.domains = [self.core.domain_values(v) for v in range(len(self.core.variables))]
+        if not all(self.domains):
+            raise ValueError("local search needs a value in every domain")
+        # Assigned variables and variables with a single value are never moved
+        self.fixed = [self.core.assigned[v] != -1 or len(self.domains[v]) == 1 for v in range(len(self.core.variables))]
+        self.iterations = 0
+        self.stopped = False
+        self.initial_coloring()
+
+
+    def initial_coloring(self) -> None:
+        """
+        Colors every free vertex DSATUR-style (most distinct neighbor values first, ties broken by degree) with the
+        first value of its domain no neighbor holds, or the value with the fewest conflicts when there is none.
+        Then builds the neighbor counts, the conflicting vertices and the best coloring.
+        """
+        core = self.core
+        n, k = len(core.variables), self.k
+        colors = array('i', [-1]) * n
+        counts = array('i', [0]) * (n * k)
+        for v in range(n):
+            if self.fixed[v]:
+                colors[v] = core.assigned[v] if core.assigned[v] != -1 else self.domains[v][0]
+                for neighbor in core.neighbors(v):
+                    counts[neighbor * k + colors[v]] += 1
+
+        saturation = [0] * n  # bitmask of neighbor values
+        for v in range(n):
+            for c in range(k):
+                if counts[v * k + c]:
+                    saturation[v] |= 1 << c
+        heap = [(-bin(saturation[v]).count('1'), -core.degree(v), v) for v in range(n) if not self.fixed[v]]
+        heap.sort()
+        while heap:
+            negative_saturation, negative_degree, v = heappop(heap)
+            if colors[v] != -1 or -negative_saturation != bin(saturation[v]).count('1'):
+                continue
+            base = v * k
+            color = min(self.domains[v], key=lambda c: counts[base + c])
+            colors[v] = color
+            for neighbor in core.neighbors(v):
+                counts[neighbor * k + color] += 1
+                if colors[neighbor] == -1 and not saturation[neighbor] >> color & 1:
+                    saturation[neighbor] |= 1 << color
+                    heappush(heap, (-bin(saturation[neighbor]).count('1'), -core.degree(neighbor), neighbor))
+
+        self.colors = colors
+        self.counts = counts
+        self.tabu = array('q', [0]) * (n * k)  # iteration until which each (vertex, value) pair is tabu
+        self.conflicts = sum(counts[v * k + colors[v]] for v in range(n)) // 2
+        # Free vertices with at least one conflict, with their positions for O(1) removal
+        self.conflicting = []
+        self.position = {}
+        for v in range(n):
+            if not self.fixed[v] and counts[v * k + colors[v]]:
+                self.position[v] = len(self.conflicting)
+                self.conflicting.append(v)
+        self.best_colors = array('i', colors)
+        self.best_conflicts = self.conflicts
+
+
+    def _update_conflicting(self, v: int) -> None:
+        # Adds v to or removes it from the conflicting vertices after its own or a neighbor's value changed
+        in_conflict = not self.fixed[v] and self.counts[v * self.k + self.colors[v]] > 0
+        position = self.position.get(v)
+        if in_conflict and position is None:
+            self.position[v] = len(self.conflicting)
+            self.conflicting.append(v)
+        elif not in_conflict and position is not None:
+            last = self.conflicting.pop()
+            if last != v:
+                self.conflicting[position] = last
+                self.position[last] = position
+            del self.position[v]
+
+
+    def move(self, v: int, color: int) -> None:
+        """
+        Recolors vertex v, updating the neighbor counts, the conflicting vertices and the conflict count in
+        O(degree).
+        """
+        k, counts, colors = self.k, self.counts, self.colors
+        old = colors[v]
+        self.conflicts += counts[v * k + color] - counts[v * k + old]
+        colors[v] = color
+        for neighbor in self.core.neighbors(v):
+            counts[neighbor * k + old] -= 1
+            counts[neighbor * k + color] += 1
+            self._update_conflicting(neighbor)
+        self._update_conflicting(v)
+
+
+    def search(self, max_iterations: Optional[int] = None, time_limit: Optional[float] = None) -> int:
+        """
+        Runs min-conflicts moves until no edge is in conflict or the budget runs out. Can be called again to
+        continue with a new budget.
+
+        Args:
+            max_iterations (int, optional): Maximum number of moves. Defaults to no limit.
+            time_limit (float, optional): Maximum number of seconds. Defaults to no limit.
+
+        Returns:
+            int: The number of conflicting edges of the best coloring found.
+        """
+        k, counts, colors, domains, tabu = self.k, self.counts, self.colors, self.domains, self.tabu
+        rng = self.random
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        limit = self.iterations + max_iterations if max_iterations is not None else None
+        self.stopped = False
+        while self.conflicts > 0 and self.conflicting:
+            if limit is not None and self.iterations >= limit:
+                self.stopped = True
+                break
+            if deadline is not None and self.iterations % 1024 == 0 and time.perf_counter() >= deadline:
+                self.stopped = True
+                break
+            self.iterations += 1
+            iteration = self.iterations
+
+            v = self.conflicting[rng.randrange(len(self.conflicting))]
+            base = v * k
+            old = colors[v]
+            if rng.random() < self.walk_probability:
+                color = rng.choice(domains[v])
+                if color == old:
+                    continue
+            else:
+                # Value with the fewest conflicts, keeping the current one on ties; a tabu value is allowed only if
+                # it leads to a new best coloring
+                current = counts[base + old]
+                color, best, ties = old, current, 0
+                for c in domains[v]:
+                    count = counts[base + c]
+                    if c == old or count > best:
+                        continue
+                    if tabu[base + c] > iteration and self.conflicts + count - current >= self.best_conflicts:
+                        continue
+                    if count < best:
+                        color, best, ties = c, count, 1
+                    elif color != old:
+                        ties += 1
+                        if rng.randrange(ties) == 0:
+                            color = c
+                if color == old:
+                    continue
+            tabu[base + old] = iteration + self.tabu_tenure + rng.randrange(self.tabu_tenure + 1)
+            self.move(v, color)
+            if self.conflicts < self.best_conflicts:
+                self.best_conflicts = self.conflicts
+                self.best_colors = array('i', colors)
+        return self.best_conflicts
+
+
+    def best_assignment(self) -> Dict:
+        """
+        Returns the best coloring found so far, which may still have conflicts.
+
+        Returns:
+            dict: Maps every variable to its value.
+        """
+        values = self.core.values
+        return {var: values[self.best_colors[v]] for v, var in enumerate(self.core.variables)}
+
+
+    def solve(self, max_iterations: Optional[int] = None, time_limit: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """
+        Searches for a coloring without conflicts and stores it in the CSP.
+
+        Args:
+            max_iterations (int, optional): Maximum number of moves. Defaults to no limit.
+            time_limit (float, optional): Maximum number of seconds. Defaults to no limit.
+
+        Returns:
+            dict: The assignments of the CSP, or None if the budget ran out first (self.best_conflicts and
+            best_assignment() then describe the best coloring found). Only csp.assignments_number, which counts
+            the initial coloring and the moves, is changed in that case.
+        """
+        before = self.iterations
+        self.search(max_iterations=max_iterations, time_limit=time_limit)
+        self.csp.assignments_number += self.iterations - before
+        if before == 0:
+            self.csp.assignments_number += sum(1 for fixed in self.fixed if not fixed)
+        if self.best_conflicts > 0:
+            return None
+        for var, value in self.best_assignment().items():
+            self.csp.assignments[var] = value
+            self.csp.variables[var] = [value]
+        self.csp.unassigned_var = []
+        return self.csp.assignments
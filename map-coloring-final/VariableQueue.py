@@ -0,0 +1,156 @@
+from heapq import heapify, heappop, heappush
+from typing import List, Optional, Tuple
+from CSP import CSP
+
+
+
+class VariableQueue(object):
+    """
+    Priority queue of the unassigned variables of a CSP, ordered DSATUR-style by
+    (remaining values, -number of unassigned neighbors, insertion order). Remaining values are the values of the
+    domain not held by an assigned neighbor, so the ordering saturates correctly even when nothing prunes domains.
+
+    The queue is a lazy binary heap: whenever the key of a variable changes a new entry is pushed, and stale
+    entries are discarded when they reach the top. Selection is therefore O(log n) amortized instead of a scan
+    over every unassigned variable.
+
+    Attributes:
+        csp (CSP): The CSP whose variables are ordered.
+        neighbors (dict): Maps each variable to its distinct constrained neighbors.
+        degree (dict): Maps each variable to the number of its unassigned neighbors.
+        used (dict): Maps each variable to a {value: count} dictionary of the values held by its assigned neighbors.
+        keys (dict): The current key of each queued variable.
+        heap (list): Heap of (key, variable) entries, possibly stale.
+
+    Methods:
+        select(): Returns the unassigned variable with the smallest key.
+        assigned(variable, value, removed): Updates the queue after variable was assigned and values were pruned.
+        unassigned(variable, value, removed): Updates the queue after variable was unassigned and values were restored.
+    """
+
+    def __init__(self, csp: CSP) -> None:
+        """
+        Initializes a VariableQueue object from the current state of a CSP.
+
+        Args:
+            csp (CSP): The CSP whose unassigned variables should be ordered.
+        """
+        self.csp = csp
+        self.order = {var: i for i, var in enumerate(csp.variables)}
+        self.neighbors = {}
+        for var in csp.variables:
+            self.neighbors[var] = list(dict.fromkeys(neighbor for func, neighbor in csp.var_constraints.get(var, [])
+                                                     if neighbor != var and neighbor in csp.variables))
+        self.degree = {var: sum(1 for neighbor in neighbors if not csp.is_assigned(neighbor))
+                       for var, neighbors in self.neighbors.items()}
+        self.used = {var: {} for var in csp.variables}
+        for var in csp.variables:
+            if csp.is_assigned(var):
+                for neighbor in self.neighbors[var]:
+                    used = self.used[neighbor]
+                    used[csp.assignments[var]] = used.get(csp.assignments[var], 0) + 1
+        self.keys = {}
+        self.heap = []
+        for var in csp.unassigned_var:
+            self.update(var)
+
+
+    def key(self, variable: str) -> Tuple[int, int, int]:
+        """
+        Computes the current ordering key of a variable.
+        """
+        used = self.used[variable]
+        remaining = sum(1 for value in self.csp.variables[variable] if value not in used)
+        return (remaining, -self.degree[variable], self.order[variable])
+
+
+    def update(self, variable: str) -> None:
+        """
+        Re-queues a variable if its key has changed.
+
+        Args:
+            variable (str): The variable whose domain or unassigned degree may have changed.
+
+        Returns:
+            None
+        """
+        if self.csp.is_assigned(variable):
+            return
+        key = self.key(variable)
+        if self.keys.get(variable) != key:
+            self.keys[variable] = key
+            heappush(self.heap, (key, variable))
+            if len(self.heap) > 4 * len(self.order) + 64:
+                self.compact()
+
+
+    def compact(self) -> None:
+        """
+        Drops every stale entry from the heap.
+        """
+        self.heap = [(key, var) for var, key in self.keys.items()]
+        heapify(self.heap)
+
+
+    def select(self) -> Optional[str]:
+        """
+        Returns the unassigned variable with the fewest remaining values, breaking ties by the largest number of
+        unassigned neighbors.
+
+        Returns:
+            str: The selected variable, or None if every variable is assigned.
+        """
+        heap = self.heap
+        while heap:
+            key, var = heap[0]
+            if self.keys.get(var) == key and not self.csp.is_assigned(var):
+                return var
+            heappop(heap)
+        return None
+
+
+    def assigned(self, variable: str, value, removed: List[Tuple[str, str]]) -> None:
+        """
+        Updates the queue after a variable has been assigned.
+
+        Args:
+            variable (str): The variable that has been assigned.
+            value: The value assigned to it.
+            removed (list): The (variable, value) pairs pruned by the assignment and its propagation.
+
+        Returns:
+            None
+        """
+        self.keys.pop(variable, None)
+        for neighbor in self.neighbors[variable]:
+            used = self.used[neighbor]
+            used[value] = used.get(value, 0) + 1
+            self.degree[neighbor] -= 1
+            self.update(neighbor)
+        for var, val in removed:
+            self.update(var)
+
+
+    def unassigned(self, variable: str, value, removed: List[Tuple[str, str]]) -> None:
+        """
+        Updates the queue after a variable has been unassigned and its pruned values restored.
+
+        Args:
+            variable (str): The variable that has been unassigned.
+            value: The value it held.
+            removed (list): The (variable, value) pairs that have been restored.
+
+        Returns:
+            None
+        """
+        for neighbor in self.neighbors[variable]:
+            used = self.used[neighbor]
+            if used[value] == 1:
+                del used[value]
+            else:
+                used[value] -= 1
+            self.degree[neighbor] += 1
+            self.update(neighbor)
+        for var, val in removed:
+            self.update(var)
+        self.update(variable)
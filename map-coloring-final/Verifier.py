@@ -0,0 +1,208 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from neighborhood import neighborhood_graph, to_csr
+
+
+
+class Verifier(object):
+    """
+    Checks and scores many colorings of one constraint graph at once.
+
+    The graph is interned once into two arrays holding the endpoints of every edge, and colorings are rows of an
+    integer matrix (colorings x regions, -1 for an uncolored region). The conflicts of a whole batch are then a
+    single gather and comparison, matrix[:, left] == matrix[:, right], instead of a Python call per border and per
+    coloring. Rows are processed in chunks so that the boolean edge matrix stays small.
+
+    Attributes:
+        names (list): The regions, in column order.
+        index (dict): Maps each region to its column.
+        left (np.ndarray): The first endpoint of every edge, as columns.
+        right (np.ndarray): The second endpoint of every edge, as columns; left < right.
+        chunk_size (int): Number of colorings checked per vectorized pass.
+    """
+
+    def __init__(self, graph: Dict[str, List[str]], chunk_size: int = 65536) -> None:
+        """
+        Initializes a Verifier object.
+
+        Args:
+            graph (dict): Maps each region to the regions it must get a different color from, such as a borders
+                dictionary or the distance-k graph of neighborhood_graph. Edges may be listed from one side only.
+            chunk_size (int, optional): Number of colorings checked per vectorized pass. Defaults to 65536.
+        """
+        names, offsets, targets = to_csr(graph)
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        degrees = np.diff(np.frombuffer(offsets, dtype=np.int32))
+        left = np.repeat(np.arange(len(names), dtype=np.int32), degrees)
+        right = np.frombuffer(targets, dtype=np.int32)
+        keep = left < right
+        self.left = left[keep]
+        self.right = right[keep]
+        self.chunk_size = chunk_size
+
+
+    @classmethod
+    def for_map(cls, continent: str, k: int = 1, dataset: str = './countries_dataset.csv', **kwargs) -> "Verifier":
+        """
+        Creates a Verifier for the distance-k constraint graph of a continent (k=1: its borders).
+        """
+        return cls(neighborhood_graph(continent, k, dataset), **kwargs)
+
+
+    def encode(self, assignments: Iterable[Dict], colors: Optional[Sequence] = None) -> np.ndarray:
+        """
+        Converts colorings given as dictionaries (such as solver results) into a colorings x regions matrix.
+
+        Args:
+            assignments (iterable): Colorings mapping regions to colors; missing or None values are uncolored.
+            colors (list, optional): The palette, giving each color its number. Defaults to the colors in order of
+                first appearance.
+
+        Returns:
+            np.ndarray: The color numbers, -1 for uncolored regions.
+
+        Raises:
+            ValueError: If a coloring uses a color outside the given palette.
+        """
+        codes = {color: code for code, color in enumerate(colors)} if colors is not None else {}
+        names = self.names
+        rows = []
+        for assignment in assignments:
+            row = []
+            for name in names:
+                color = assignment.get(name)
+                if color is None:
+                    row.append(-1)
+                    continue
+                code = codes.get(color)
+                if code is None:
+                    if colors is not None:
+                        raise ValueError("%s has color %r, which is not in the palette" % (name, color))
+                    code = codes[color] = len(codes)
+                row.append(code)
+            rows.append(row)
+        return np.array(rows, dtype=np.int32).reshape(len(rows), len(names))
+
+
+    def decode(self, coloring: np.ndarray, colors: Optional[Sequence] = None) -> Dict:
+        """
+        Converts one row of a coloring matrix back into a dictionary, None for uncolored regions.
+        """
+        return {name: (None if code < 0 else colors[code] if colors is not None else int(code))
+                for name, code in zip(self.names, coloring.tolist())}
+
+
+    def check_shape(self, colorings) -> np.ndarray:
+        # Accepts a single coloring as a vector and returns a 2-D integer matrix with one column per region
+        colorings = np.asarray(colorings)
+        if colorings.ndim == 1:
+            colorings = colorings[np.newaxis, :]
+        if colorings.ndim != 2 or colorings.shape[1] != len(self.names):
+            raise ValueError("expected a colorings x %d matrix, got shape %s" % (len(self.names), colorings.shape))
+        if not np.issubdtype(colorings.dtype, np.signedinteger):
+            # Unsigned arrays cannot hold -1, so an "uncolored" marker would be read as a color
+            raise ValueError("colorings must be signed color numbers (-1 for uncolored, e.g. int8), got %s" % colorings.dtype)
+        return colorings
+
+
+    def conflicts(self, colorings) -> np.ndarray:
+        """
+        Counts the conflicting edges of every coloring; uncolored regions conflict with nothing.
+
+        Args:
+            colorings (array-like): A colorings x regions matrix of color numbers, or a single coloring.
+
+        Returns:
+            np.ndarray: The number of edges whose endpoints share a color, per coloring.
+        """
+        colorings = self.check_shape(colorings)
+        result = np.empty(len(colorings), dtype=np.int64)
+        left, right = self.left, self.right
+        for start in range(0, len(colorings), self.chunk_size):
+            chunk = colorings[start:start + self.chunk_size]
+            a = chunk[:, left]
+            same = a == chunk[:, right]
+            same &= a >= 0
+            result[start:start + len(chunk)] = np.count_nonzero(same, axis=1)
+        return result
+
+
+    def conflicting_edges(self, coloring) -> List[tuple]:
+        """
+        Returns the edges (region, region) whose endpoints share a color in one coloring.
+        """
+        coloring = self.check_shape(coloring)[0]
+        a = coloring[self.left]
+        same = (a == coloring[self.right]) & (a >= 0)
+        names = self.names
+        return [(names[i], names[j]) for i, j in zip(self.left[same].tolist(), self.right[same].tolist())]
+
+
+    def balance(self, colorings, colors_number: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Measures how evenly every coloring uses the palette.
+
+        The class sizes of all colorings are computed with one bincount over (coloring, color) pairs.
+
+        Args:
+            colorings (array-like): A colorings x regions matrix of color numbers, or a single coloring.
+            colors_number (int, optional): The size of the palette. Defaults to the largest color number plus one.
+
+        Returns:
+            dict: Per coloring, "counts" (colorings x colors, regions of every color), "colors_used", "largest"
+                and "smallest" (sizes of the largest and smallest color classes of the palette), "spread"
+                (largest - smallest) and "std" (standard deviation of the class sizes).
+
+        Raises:
+            ValueError: If a color number is out of the palette.
+        """
+        colorings = self.check_shape(colorings)
+        if colors_number is None:
+            colors_number = int(colorings.max(initial=-1)) + 1
+        if colorings.size and (colorings.min() < -1 or colorings.max() >= colors_number):
+            raise ValueError("color numbers must be between -1 and %d" % (colors_number - 1))
+        width = colors_number + 1  # One more column, dropped afterwards, collects the uncolored regions
+        counts = np.empty((len(colorings), colors_number), dtype=np.int64)
+        for start in range(0, len(colorings), self.chunk_size):
+            chunk = colorings[start:start + self.chunk_size]
+            rows = np.arange(len(chunk), dtype=np.int64)[:, np.newaxis] * width
+            bins = np.bincount((rows + chunk + 1).ravel(), minlength=len(chunk) * width)
+            counts[start:start + len(chunk)] = bins.reshape(len(chunk), width)[:, 1:]
+        if colors_number:
+            largest, smallest = counts.max(axis=1), counts.min(axis=1)
+        else:
+            largest = smallest = np.zeros(len(colorings), dtype=np.int64)
+        return {
+            "counts": counts,
+            "colors_used": np.count_nonzero(counts, axis=1),
+            "largest": largest,
+            "smallest": smallest,
+            "spread": largest - smallest,
+            "std": counts.std(axis=1) if colors_number else np.zeros(len(colorings)),
+        }
+
+
+    def score(self, colorings, colors_number: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Validates and scores a batch of colorings.
+
+        Args:
+            colorings (array-like): A colorings x regions matrix of signed color numbers (-1 for uncolored), or a
+                single coloring. int8 holds up to 127 colors in one byte per region.
+            colors_number (int, optional): The size of the palette. Defaults to the largest color number plus one.
+
+        Returns:
+            dict: Per coloring, "conflicts", "uncolored" (number of uncolored regions), "valid" (complete and
+                without conflicts), and the color-balance metrics of balance.
+        """
+        colorings = self.check_shape(colorings)
+        conflicts = self.conflicts(colorings)
+        uncolored = np.count_nonzero(colorings < 0, axis=1)
+        return {
+            "conflicts": conflicts,
+            "uncolored": uncolored,
+            "valid": (conflicts == 0) & (uncolored == 0),
+            **self.balance(colorings, colors_number),
+        }
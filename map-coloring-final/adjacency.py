@@ -0,0 +1,102 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+_tree = None
+_boundaries = None
+
+
+def _init_worker(wkb: np.ndarray) -> None:
+    """
+    Rebuilds the spatial index in a worker process from the WKB of the geometries.
+    """
+    global _tree, _boundaries
+    geometries = shapely.from_wkb(wkb)
+    _tree = STRtree(geometries)
+    _boundaries = None
+
+
+def _query_chunk(start: int, stop: int, predicate: str, min_shared_length: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the adjacent pairs (i, j), i < j, for the geometries start..stop-1 of the global spatial index.
+    """
+    global _boundaries
+    geometries = _tree.geometries
+    left, right = _tree.query(geometries[start:stop], predicate=predicate)
+    left = left + start
+    keep = left < right
+    left, right = left[keep], right[keep]
+    if min_shared_length > 0 and len(left):
+        if _boundaries is None:
+            _boundaries = shapely.boundary(geometries)
+        shared = shapely.length(shapely.intersection(_boundaries[left], _boundaries[right]))
+        keep = shared >= min_shared_length
+        left, right = left[keep], right[keep]
+    return left, right
+
+
+def derive_adjacency(ids: Sequence[str], geometries: Sequence, predicate: str = 'intersects', min_shared_length: float = 0.0,
+                     workers: Optional[int] = None, chunk_size: int = 4096, cache_dir: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Derives the neighbor lists of a set of polygons. All geometries are bulk-queried against an STRtree, so only
+    pairs whose bounding boxes overlap are tested with the predicate: O(n log n) instead of O(n^2) geometry tests.
+
+    Args:
+        ids (list): The region identifiers, in the same order as geometries.
+        geometries (list): The shapely geometries of the regions.
+        predicate (str, optional): The STRtree predicate defining adjacency; 'intersects' tolerates small overlaps
+            between neighboring polygons, 'touches' requires exact shared boundaries. Defaults to 'intersects'.
+        min_shared_length (float, optional): Minimum length of shared boundary for two regions to be neighbors,
+            e.g. to ignore regions meeting at a single corner. Defaults to 0 (no threshold).
+        workers (int, optional): Number of worker processes; the queries are split in chunks of chunk_size
+            geometries. Defaults to a single process.
+        chunk_size (int, optional): Number of geometries queried per chunk. Defaults to 4096.
+        cache_dir (str, optional): Directory in which the result is cached, keyed by a hash of the geometries and
+            the parameters. Defaults to no caching.
+
+    Returns:
+        dict: Maps each identifier to the identifiers of its neighbors.
+    """
+    ids = list(ids)
+    wkb = shapely.to_wkb(np.asarray(geometries, dtype=object))
+
+    cache_path = None
+    if cache_dir is not None:
+        digest = hashlib.sha256()
+        digest.update(repr((predicate, float(min_shared_length), ids)).encode())
+        for blob in wkb:
+            digest.update(blob)
+        cache_path = os.path.join(cache_dir, 'adjacency-' + digest.hexdigest()[:32] + '.pickle')
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+    chunks = [(start, min(start + chunk_size, len(ids))) for start in range(0, len(ids), chunk_size)]
+    if workers is not None and workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(wkb,)) as executor:
+            futures = [executor.submit(_query_chunk, start, stop, predicate, min_shared_length) for start, stop in chunks]
+            pairs = [future.result() for future in futures]
+    else:
+        _init_worker(wkb)
+        pairs = [_query_chunk(start, stop, predicate, min_shared_length) for start, stop in chunks]
+
+    borders = {region: [] for region in ids}
+    for left, right in pairs:
+        for i, j in zip(left.tolist(), right.tolist()):
+            borders[ids[i]].append(ids[j])
+            borders[ids[j]].append(ids[i])
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(cache_path + '.tmp', 'wb') as f:
+            pickle.dump(borders, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(cache_path + '.tmp', cache_path)
+    return borders
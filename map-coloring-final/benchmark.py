@@ -0,0 +1,323 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+from CSP import CSP
+from Solver import Solver
+from chromatic import minimum_colors
+from instrumentation import Instrumentation
+from LocalSearch import LocalSearch
+from neighborhood import emit_constraints, neighborhood_graph
+
+
+CONTINENTS = ["Africa", "America", "Asia", "Europe"]
+
+# Solver keyword arguments of every benchmarked configuration
+CONFIGURATIONS = {
+    "plain": {},
+    "mrv": {"variable_heuristics": True},
+    "lcv": {"domain_heuristics": True},
+    "ac3": {"AC_3": True},
+    "mrv+lcv": {"variable_heuristics": True, "domain_heuristics": True},
+    "mrv+ac3": {"variable_heuristics": True, "AC_3": True},
+    "mrv+lcv+ac3": {"variable_heuristics": True, "domain_heuristics": True, "AC_3": True},
+    "dsatur+fc": {"DSATUR": True, "forward_checking": True},
+    "dsatur+mac": {"DSATUR": True, "MAC": True},
+}
+
+# Min-conflicts local search, run by run_case instead of a Solver configuration
+LOCAL_SEARCH = "local-search"
+
+# MRV and AC-3 rescan every variable or arc at every node, so only the incremental configurations scale
+SYNTHETIC_CONFIGURATIONS = ["dsatur+fc", "dsatur+mac", LOCAL_SEARCH]
+SYNTHETIC_SIZES = [100, 1000, 10000]
+# Only run with --large: a Python systematic search cannot color them, and local search needs 15 to 40 seconds
+# each, so they get at least LARGE_TIME_LIMIT seconds
+LARGE_SIZES = [100000]
+LARGE_TIME_LIMIT = 120.0
+
+# Largest synthetic graph every generator is searched systematically on. 4-coloring a planar triangulation is
+# hard for backtracking: DSATUR with forward checking already runs into the time limit on a 1000-vertex Delaunay
+# triangulation and a 10000-vertex planar grid, so larger graphs are only colored by local search.
+SYSTEMATIC_MAX_SIZE = {"planar": 1000, "delaunay": 100}
+
+DEFAULT_BASELINE = "./benchmark_baseline.json"
+
+
+def planar_graph(n: int, seed: int = 0) -> Dict[int, List[int]]:
+    """
+    Generates a random planar graph with about n vertices: a grid in which every cell is split by one of its two
+    diagonals, chosen at random. Interior vertices have degree 4 to 8, like regions of a real map.
+
+    Args:
+        n (int): Approximate number of vertices (rounded to a square).
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        dict: Maps each vertex to its neighbors.
+    """
+    rng = random.Random(seed)
+    side = max(2, int(round(n ** 0.5)))
+    graph = {i: [] for i in range(side * side)}
+
+    def link(a: int, b: int) -> None:
+        graph[a].append(b)
+        graph[b].append(a)
+
+    for row in range(side):
+        for col in range(side):
+            v = row * side + col
+            if col + 1 < side:
+                link(v, v + 1)
+            if row + 1 < side:
+                link(v, v + side)
+            if row + 1 < side and col + 1 < side:
+                if rng.random() < 0.5:
+                    link(v, v + side + 1)
+                else:
+                    link(v + 1, v + side)
+    return graph
+
+
+def delaunay_graph(n: int, seed: int = 0) -> Dict[int, List[int]]:
+    """
+    Generates the Delaunay triangulation of n random points in the unit square, the usual model of a map whose
+    regions are Voronoi cells. Requires shapely.
+
+    Args:
+        n (int): Number of vertices.
+        seed (int, optional): Random seed. Defaults to 0.
+
+    Returns:
+        dict: Maps each vertex to its neighbors.
+    """
+    import shapely
+
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    index = {point: i for i, point in enumerate(points)}
+    edges = shapely.delaunay_triangles(shapely.MultiPoint(points), only_edges=True)
+    graph = {i: [] for i in range(n)}
+    for line in edges.geoms:
+        a, b = (index[tuple(coords)] for coords in line.coords)
+        graph[a].append(b)
+        graph[b].append(a)
+    return graph
+
+
+def build_csp(graph: Dict, colors_number: int) -> CSP:
+    """
+    Creates the coloring CSP of a graph with colors_number interchangeable colors.
+    """
+    csp = CSP()
+    emit_constraints(csp, graph)
+    for var in graph:
+        csp.add_variable(var, list(range(colors_number)))
+    return csp
+
+
+def run_case(name: str, graph: Dict, colors_number: int, configuration: str, time_limit: Optional[float],
+             track_memory: bool = True) -> Dict:
+    """
+    Solves one benchmark case with the iterative engine, or with local search for LOCAL_SEARCH, and measures it.
+
+    Args:
+        name (str): Identifier of the case in the results and the baseline.
+        graph (dict): The constraint graph.
+        colors_number (int): Size of the palette.
+        configuration (str): Key of CONFIGURATIONS, or LOCAL_SEARCH.
+        time_limit (float, optional): Seconds after which the search gives up.
+        track_memory (bool, optional): Whether to measure the peak memory allocated while building and solving
+            the CSP with tracemalloc, which slows the run down. Defaults to True.
+
+    Returns:
+        dict: The measurements: time (seconds, including the CSP build), assignments_number, the Instrumentation
+        counters backtracks, consistency_checks, arc_revisions and max_depth, peak_memory (bytes), solved and
+        stopped.
+    """
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    csp = build_csp(graph, colors_number)
+    instrumentation = Instrumentation()
+    if configuration == LOCAL_SEARCH:
+        # Local search has no backtracks; it is bounded by 100 moves per vertex, as main.py -ls
+        solver = LocalSearch(csp, seed=0)
+        result = solver.solve(max_iterations=100 * len(graph), time_limit=time_limit)
+    else:
+        solver = Solver(csp=csp, instrumentation=instrumentation, **CONFIGURATIONS[configuration])
+        result = solver.iterative_solver(time_limit=time_limit)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if track_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "case": name,
+        "configuration": configuration,
+        "variables": len(graph),
+        "colors": colors_number,
+        "time": elapsed,
+        "assignments_number": csp.assignments_number,
+        "backtracks": instrumentation.backtracks,
+        "consistency_checks": instrumentation.consistency_checks,
+        "arc_revisions": instrumentation.arc_revisions,
+        "max_depth": instrumentation.max_depth,
+        "peak_memory": peak,
+        "solved": result is not None,
+        "stopped": solver.stopped,
+    }
+
+
+def benchmark_cases(continents: List[str], distances: List[int], configurations: List[str], sizes: List[int],
+                    synthetic_configurations: List[str]):
+    """
+    Yields the (name, graph, colors_number, configuration) of every benchmark case.
+
+    The continents are colored with 4 colors for ND=1, as in main.py, and with their minimum number of colors for
+    larger distances, so every case is satisfiable. Synthetic graphs are planar and colored with 4 colors; the
+    systematic configurations only run up to SYSTEMATIC_MAX_SIZE vertices, local search at every size.
+    """
+    for continent in continents:
+        for distance in distances:
+            graph = neighborhood_graph(continent, distance)
+            colors_number = 4 if distance == 1 else minimum_colors(graph)[0]
+            for configuration in configurations:
+                yield "%s/ND%d/%s" % (continent, distance, configuration), graph, colors_number, configuration
+    for size in sizes:
+        generators = [("planar", planar_graph)]
+        try:
+            import shapely  # noqa: F401
+            generators.append(("delaunay", delaunay_graph))
+        except ImportError:
+            pass
+        for kind, generator in generators:
+            selected = [configuration for configuration in synthetic_configurations
+                        if configuration == LOCAL_SEARCH or size <= SYSTEMATIC_MAX_SIZE[kind]]
+            if not selected:
+                continue
+            graph = generator(size)
+            for configuration in selected:
+                yield "%s-%d/%s" % (kind, size, configuration), graph, 4, configuration
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float = 0.25, min_time: float = 0.05) -> List[Dict]:
+    """
+    Compares benchmark results with a baseline.
+
+    Args:
+        results (list): The records returned by run_case.
+        baseline (dict): A previous benchmark output, as written by main().
+        threshold (float, optional): Relative increase above which a metric is a regression. Defaults to 0.25.
+        min_time (float, optional): Time differences below this many seconds are ignored as noise. Defaults to 0.05.
+
+    Returns:
+        list: One record per regression: case, metric, baseline and current value.
+    """
+    previous = {record["case"]: record for record in baseline.get("results", [])}
+    regressions = []
+    for record in results:
+        old = previous.get(record["case"])
+        if old is None:
+            continue
+        if old["solved"] and not record["solved"]:
+            regressions.append({"case": record["case"], "metric": "solved", "baseline": True, "current": False})
+        for metric in ("time", "assignments_number", "peak_memory"):
+            if not old.get(metric) or not record.get(metric):
+                continue
+            if metric == "time" and record[metric] - old[metric] < min_time:
+                continue
+            # A search cut off by the time limit has no meaningful node count
+            if metric == "assignments_number" and (old["stopped"] or record["stopped"]):
+                continue
+            if record[metric] > old[metric] * (1 + threshold):
+                regressions.append({"case": record["case"], "metric": metric, "baseline": old[metric],
+                                    "current": record[metric]})
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmark suite, writes the results as JSON and compares them with the stored baseline.
+
+    Command-line arguments:
+    - --continents, --distances, --configurations: The continental cases (all continents, ND=1..3, every configuration).
+    - --sizes, --synthetic-configurations: The synthetic planar and Delaunay cases (100 to 10k vertices).
+    - --large: Also the 100k-vertex synthetic cases, with local search only and at least 120 seconds each.
+    - --quick: Only ND=1, the first two sizes, one systematic synthetic configuration and local search.
+    - --time-limit: Seconds after which a single case gives up (default 30).
+    - --no-memory: Do not measure peak memory (faster, more accurate times).
+    - --output: Where to write the results (default: standard output).
+    - --baseline: The baseline to compare with (default ./benchmark_baseline.json).
+    - --save-baseline: Store the results as the new baseline instead of comparing.
+    - --threshold: Relative increase reported as a regression (default 0.25).
+
+    The exit status is 1 if a regression was found.
+    """
+    parser = argparse.ArgumentParser(prog="Map Coloring benchmark", description="Benchmarks the map coloring solver")
+    parser.add_argument("--continents", nargs="+", default=CONTINENTS)
+    parser.add_argument("--distances", nargs="+", type=int, default=[1, 2, 3])
+    parser.add_argument("--configurations", nargs="+", choices=list(CONFIGURATIONS), default=list(CONFIGURATIONS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SYNTHETIC_SIZES)
+    parser.add_argument("--synthetic-configurations", nargs="+", choices=list(CONFIGURATIONS) + [LOCAL_SEARCH],
+                        default=SYNTHETIC_CONFIGURATIONS)
+    parser.add_argument("--large", action="store_true", help="Also color 100k-vertex synthetic maps with local search")
+    parser.add_argument("--quick", action="store_true",
+                        help="Only ND=1, the two smallest synthetic sizes, one systematic synthetic configuration and local search")
+    parser.add_argument("--time-limit", type=float, default=30.0, help="Seconds after which a single case gives up")
+    parser.add_argument("--no-memory", action="store_true", help="Do not measure peak memory")
+    parser.add_argument("--output", default=None, help="File the JSON results are written to (default: standard output)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Relative increase reported as a regression")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.distances = [1]
+        args.sizes = sorted(args.sizes)[:2]
+        systematic = [configuration for configuration in args.synthetic_configurations if configuration != LOCAL_SEARCH]
+        args.synthetic_configurations = systematic[:1] + [LOCAL_SEARCH]
+    runs = [(benchmark_cases(args.continents, args.distances, args.configurations, args.sizes, args.synthetic_configurations),
+             args.time_limit)]
+    if args.large and not args.quick:
+        runs.append((benchmark_cases([], [], [], LARGE_SIZES, [LOCAL_SEARCH]), max(args.time_limit, LARGE_TIME_LIMIT)))
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    results = []
+    for cases, time_limit in runs:
+        for name, graph, colors_number, configuration in cases:
+            record = run_case(name, graph, colors_number, configuration, time_limit, track_memory=not args.no_memory)
+            results.append(record)
+            print("%-36s %9.3fs %10d assignments %10d backtracks%s" % (name, record["time"], record["assignments_number"],
+                  record["backtracks"], "" if record["solved"] else "  (stopped)" if record["stopped"] else "  (no solution)"),
+                  file=sys.stderr)
+
+    output = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(output, f, indent=2)
+        print("Baseline written to", args.baseline, file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            output["regressions"] = compare(results, json.load(f), args.threshold)
+        for regression in output["regressions"]:
+            print("REGRESSION %(case)s %(metric)s: %(baseline)s -> %(current)s" % regression, file=sys.stderr)
+
+    if args.output is None:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if output.get("regressions"):
+        sys.exit(1)
+
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+from heapq import heappop, heappush
+from typing import Dict, List, Optional, Tuple
+from BitsetCSP import BitsetCSP
+
+
+def greedy_clique(core: BitsetCSP, seeds: int = 64) -> List[int]:
+    """
+    Finds a large clique greedily. Starting from each of the highest-degree vertices, the candidate that keeps
+    the most other candidates is added until no vertex is adjacent to the whole clique. The size of the clique
+    is a lower bound on the number of colors.
+
+    Args:
+        core (BitsetCSP): The constraint graph.
+        seeds (int, optional): Number of highest-degree vertices tried as starting points. Defaults to 64.
+
+    Returns:
+        List[int]: The vertex ids of the largest clique found.
+    """
+    adjacency = [set(core.neighbors(v)) for v in range(len(core.variables))]
+    best = []
+    for seed in sorted(range(len(adjacency)), key=lambda v: -len(adjacency[v]))[:seeds]:
+        if len(adjacency[seed]) < len(best):
+            break
+        clique = [seed]
+        candidates = set(adjacency[seed])
+        while candidates:
+            vertex = max(candidates, key=lambda v: (len(adjacency[v] & candidates), -v))
+            clique.append(vertex)
+            candidates &= adjacency[vertex]
+        if len(clique) > len(best):
+            best = clique
+    return best
+
+
+def dsatur_coloring(core: BitsetCSP) -> List[int]:
+    """
+    Greedy DSATUR coloring: repeatedly colors the uncolored vertex with the most distinct neighbor colors
+    (ties broken by degree) with the smallest color none of its neighbors uses. The number of colors used is an
+    upper bound on the number of colors.
+
+    Args:
+        core (BitsetCSP): The constraint graph.
+
+    Returns:
+        List[int]: The color index of every vertex.
+    """
+    n = len(core.variables)
+    colors = [-1] * n
+    saturation = [0] * n  # bitmask of neighbor colors
+    heap = [(0, -core.degree(v), v) for v in range(n)]
+    heap.sort()
+    while heap:
+        negative_saturation, negative_degree, vertex = heappop(heap)
+        if colors[vertex] != -1 or -negative_saturation != bin(saturation[vertex]).count('1'):
+            continue
+        free = ~saturation[vertex]
+        color = (free & -free).bit_length() - 1
+        colors[vertex] = color
+        for neighbor in core.neighbors(vertex):
+            if colors[neighbor] == -1 and not saturation[neighbor] >> color & 1:
+                saturation[neighbor] |= 1 << color
+                heappush(heap, (-bin(saturation[neighbor]).count('1'), -core.degree(neighbor), neighbor))
+    return colors
+
+
+def color_with_k(core: BitsetCSP, k: int, clique: List[int], hint: Optional[List[int]] = None, max_nodes: Optional[int] = None) -> Tuple[Optional[List[int]], int, bool]:
+    """
+    Searches for a coloring of the graph with k colors using forward checking on the bitset core.
+
+    The clique is precolored with colors 0..len(clique)-1 and a new color is only tried if it is the lowest one
+    not used yet, which removes the k! equivalent color permutations from unsatisfiable subtrees. Values are
+    tried starting with the color the vertex had in hint (usually the solution found with k + 1 colors).
+
+    Args:
+        core (BitsetCSP): The constraint graph; it is reset before the search.
+        k (int): The number of colors.
+        clique (list): Vertex ids of a clique of the graph.
+        hint (list, optional): A color index per vertex to try first.
+        max_nodes (int, optional): Maximum number of assignments before giving up. Defaults to no limit.
+
+    Returns:
+        Tuple[list, int, bool]: The color of every vertex (or None), the number of assignments made, and False if
+        the node budget ran out before the search was finished.
+    """
+    core.reset((1 << k) - 1)
+    if len(clique) > k:
+        return None, 0, True
+    for color, vertex in enumerate(clique):
+        core.assign(vertex, color)
+        if not core.forward_check(vertex, color):
+            return None, 0, True
+
+    n = len(core.variables)
+
+    def select() -> int:
+        best, best_key = -1, None
+        for v in range(n):
+            if core.assigned[v] == -1:
+                key = (core.domain_size(v), -core.degree(v))
+                if best_key is None or key < best_key:
+                    best, best_key = v, key
+        return best
+
+    def candidates(vertex: int, highest_used: int) -> List[int]:
+        values = [c for c in core.domain_values(vertex) if c <= highest_used + 1]
+        if hint is not None and hint[vertex] in values:
+            values.remove(hint[vertex])
+            values.insert(0, hint[vertex])
+        values.reverse()  # popped from the end
+        return values
+
+    nodes = 0
+    highest_used = len(clique) - 1
+    vertex = select()
+    if vertex == -1:
+        return list(core.assigned), nodes, True
+    # Each choice point is [vertex, candidate colors, trail mark of the current color, highest color used before]
+    stack = [[vertex, candidates(vertex, highest_used), None, highest_used]]
+    while stack:
+        frame = stack[-1]
+        vertex, values, mark, used_before = frame
+        if mark is not None:
+            core.undo(mark)
+            frame[2] = None
+        highest_used = used_before
+        advanced = False
+        while values:
+            color = values.pop()
+            if max_nodes is not None and nodes >= max_nodes:
+                return None, nodes, False
+            nodes += 1
+            mark = core.mark()
+            core.assign(vertex, color)
+            if core.forward_check(vertex, color):
+                frame[2] = mark
+                highest_used = max(used_before, color)
+                child = select()
+                if child == -1:
+                    return list(core.assigned), nodes, True
+                stack.append([child, candidates(child, highest_used), None, highest_used])
+                advanced = True
+                break
+            core.undo(mark)
+        if not advanced:
+            stack.pop()
+    return None, nodes, True
+
+
+def minimum_colors(borders: Dict[str, List[str]], max_nodes: Optional[int] = None) -> Tuple[int, Dict[str, int], Dict[str, int]]:
+    """
+    Finds the minimum number of colors needed so that neighboring regions get different colors.
+
+    A greedy clique gives a lower bound and a DSATUR coloring an upper bound; only the gap between them is
+    searched, from the upper bound downwards, so at most one unsatisfiable palette size is ever attempted. The
+    interned graph and the clique are built once and reused for every k, and each search is seeded with the
+    previous coloring.
+
+    Args:
+        borders (dict): Maps each region to the regions it must differ from.
+        max_nodes (int, optional): Assignment budget for each k. When it runs out the best coloring found so far
+            is returned and stats["proved"] is 0.
+
+    Returns:
+        Tuple[int, dict, dict]: The number of colors, the color index of every region, and statistics
+        (lower_bound, upper_bound, nodes, proved).
+    """
+    core = BitsetCSP.from_borders(borders, [])
+    clique = greedy_clique(core)
+    coloring = dsatur_coloring(core)
+    lower_bound = len(clique)
+    upper_bound = max(coloring) + 1 if coloring else 0
+    stats = {"lower_bound": lower_bound, "upper_bound": upper_bound, "nodes": 0, "proved": 1}
+
+    # The palette is only needed for its width
+    core = core.with_values(list(range(upper_bound)))
+    best = upper_bound
+    k = upper_bound - 1
+    while k >= lower_bound:
+        result, nodes, finished = color_with_k(core, k, clique, hint=coloring, max_nodes=max_nodes)
+        stats["nodes"] += nodes
+        if result is None:
+            if not finished:
+                stats["proved"] = 0
+            break
+        coloring = result
+        best = k
+        k -= 1
+
+    return best, {var: coloring[i] for i, var in enumerate(core.variables)}, stats
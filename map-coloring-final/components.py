@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+from CSP import CSP
+from Solver import Solver
+from kernel import solve_with_peeling
+
+
+def connected_components(csp: CSP) -> List[List[str]]:
+    """
+    Splits the variables of a CSP into the connected components of its constraint graph.
+
+    Args:
+        csp (CSP): The problem to split.
+
+    Returns:
+        List[list]: The variables of every component, in breadth-first order, largest components first.
+    """
+    seen = set()
+    components = []
+    for start in csp.variables:
+        if start in seen:
+            continue
+        seen.add(start)
+        component = [start]
+        for var in component:  # The list grows while it is walked, like a queue
+            neighbors = [neighbor for func, neighbor in csp.var_constraints.get(var, [])]
+            for index in csp.var_nary.get(var, ()):
+                neighbors.extend(csp.nary_constraints[index][1])
+            for neighbor in neighbors:
+                if neighbor not in seen and neighbor in csp.variables:
+                    seen.add(neighbor)
+                    component.append(neighbor)
+        components.append(component)
+    components.sort(key=len, reverse=True)
+    return components
+
+
+def _solve_component(csp: CSP, solver_options: Dict, engine: str, max_nodes: Optional[int], time_limit: Optional[float],
+                     peeling: bool = False) -> Dict:
+    """
+    Solves one component with a fresh Solver and returns its result and statistics. Runs in worker processes too.
+    """
+    if peeling:
+        result, stats = solve_with_peeling(csp, solver_options, engine, max_nodes, time_limit)
+        stats["result"] = dict(result) if result is not None else None
+        return stats
+    solver = Solver(csp=csp, **solver_options)
+    if engine == "cbj":
+        result = solver.cbj_solver(max_nodes=max_nodes, time_limit=time_limit)
+    elif engine == "iterative":
+        result = solver.iterative_solver(max_nodes=max_nodes, time_limit=time_limit)
+    else:
+        result = solver.backtrack_solver()
+    return {
+        "result": dict(result) if result is not None else None,
+        "stopped": solver.stopped,
+        "assignments_number": csp.assignments_number,
+        "backjumps": solver.backjumps,
+        "nogood_hits": solver.nogood_hits,
+        "peeled": 0,
+    }
+
+
+def solve_by_components(csp: CSP, solver_options: Optional[Dict] = None, engine: str = "backtrack", workers: Optional[int] = None,
+                        max_nodes: Optional[int] = None, time_limit: Optional[float] = None, peeling: bool = False) -> Tuple[Optional[Dict[str, str]], Dict]:
+    """
+    Solves every connected component of the constraint graph independently, so that a failure in one landmass
+    never makes the search backtrack into another, and merges the results into csp.
+
+    Variables without constraints are given the first value of their domain directly. The other components are
+    solved one after the other or, with workers > 1, in worker processes; the first component without a solution
+    makes the whole problem unsatisfiable and cancels the components still waiting.
+
+    Args:
+        csp (CSP): The problem to solve. With workers > 1 its constraint functions must be picklable (module-level
+            functions such as CSP.not_equal, not lambdas).
+        solver_options (dict, optional): Keyword arguments of Solver used for every component. Defaults to none.
+        engine (str, optional): "backtrack", "iterative" or "cbj". Defaults to "backtrack".
+        workers (int, optional): Number of worker processes. Defaults to solving in this process.
+        max_nodes (int, optional): Assignment budget of every component for the iterative and cbj engines.
+        time_limit (float, optional): Time budget in seconds of every component for the iterative and cbj engines.
+        peeling (bool, optional): Whether to peel the low-degree variables of every component before searching
+            it (see kernel.solve_with_peeling). Defaults to False.
+
+    Returns:
+        Tuple[dict, dict]: The assignments (None if a component has no solution or ran out of budget, in which
+        case only csp.assignments_number is changed) and the statistics summed over the components
+        (assignments_number, stopped, backjumps, nogood_hits, peeled) together with the number of components and of
+        isolated variables.
+    """
+    if solver_options is None:
+        solver_options = {}
+    components = connected_components(csp)
+    stats = {"components": len(components), "isolated": 0, "assignments_number": 0, "stopped": False,
+             "backjumps": 0, "nogood_hits": 0, "peeled": 0}
+
+    subproblems = []
+    isolated = []
+    for component in components:
+        if len(component) > 1:
+            subproblems.append(csp.subproblem(component))
+        elif not csp.is_assigned(component[0]):
+            if not csp.variables[component[0]]:
+                return None, stats
+            isolated.append(component[0])
+    stats["isolated"] = len(isolated)
+
+    runs = []
+    if workers is not None and workers > 1 and len(subproblems) > 1:
+        # Imported here so that sequential runs do not pay for the multiprocessing machinery
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        with ProcessPoolExecutor(max_workers=min(workers, len(subproblems))) as executor:
+            pending = {executor.submit(_solve_component, subproblem, solver_options, engine, max_nodes, time_limit, peeling)
+                       for subproblem in subproblems}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.cancelled():
+                        continue
+                    run = future.result()
+                    runs.append(run)
+                    if run["result"] is None:
+                        for other in pending:
+                            other.cancel()
+    else:
+        for subproblem in subproblems:
+            run = _solve_component(subproblem, solver_options, engine, max_nodes, time_limit, peeling)
+            runs.append(run)
+            if run["result"] is None:
+                break
+
+    for run in runs:
+        stats["assignments_number"] += run["assignments_number"]
+        stats["backjumps"] += run["backjumps"]
+        stats["nogood_hits"] += run["nogood_hits"]
+        stats["peeled"] += run["peeled"]
+        stats["stopped"] = stats["stopped"] or run["stopped"]
+    csp.assignments_number += stats["assignments_number"]
+    if len(runs) < len(subproblems) or any(run["result"] is None for run in runs):
+        return None, stats
+
+    # Nothing can conflict with an unconstrained variable, so it is colored without entering the search
+    for var in isolated:
+        csp.assignments[var] = csp.variables[var][0]
+        csp.variables[var] = [csp.assignments[var]]
+    for run in runs:
+        for var, value in run["result"].items():
+            csp.assignments[var] = value
+            csp.variables[var] = [value]
+    csp.unassigned_var = [var for var in csp.unassigned_var if not csp.is_assigned(var)]
+    stats["assignments_number"] += len(isolated)
+    csp.assignments_number += len(isolated)
+    return csp.assignments, stats
@@ -0,0 +1,210 @@
+from typing import Callable, Dict, Hashable, Iterable, List, Sequence, Tuple
+
+
+class BinaryConstraint(object):
+    """
+    Base class of the typed binary constraints stored in CSP.var_constraints.
+
+    A binary constraint is stored once per variable, as (constraint, other_variable), and is called like the plain
+    constraint functions of the CSP: constraint(other_value, own_value). The solver recognizes the kind of the
+    constraint and replaces the per-value calls by list or bit operations.
+
+    Attributes:
+        kind (str): "not_equal", "equal" or "table".
+
+    Methods:
+        reversed(): Returns the same constraint seen from the other variable.
+    """
+
+    kind = None
+
+    def __call__(self, other_value, own_value) -> bool:
+        raise NotImplementedError
+
+    def reversed(self) -> "BinaryConstraint":
+        """
+        Returns the same constraint seen from the other variable. Symmetric constraints return themselves.
+        """
+        return self
+
+
+class NotEqual(BinaryConstraint):
+    """
+    The two variables take different values. Use the shared instance not_equal.
+    """
+
+    kind = "not_equal"
+
+    def __call__(self, other_value, own_value) -> bool:
+        return other_value != own_value
+
+    def __reduce__(self) -> str:
+        # Unpickled as the shared instance, so that worker processes can still compare it by identity
+        return "not_equal"
+
+
+class Equal(BinaryConstraint):
+    """
+    The two variables take the same value. Use the shared instance equal.
+    """
+
+    kind = "equal"
+
+    def __call__(self, other_value, own_value) -> bool:
+        return other_value == own_value
+
+    def __reduce__(self) -> str:
+        return "equal"
+
+
+not_equal = NotEqual()
+equal = Equal()
+
+
+class Table(BinaryConstraint):
+    """
+    Extensional constraint: the pairs of values the two variables may take are listed explicitly.
+
+    The values of the other variable are interned to bit positions, and for every value of the owning variable
+    the allowed values of the other one are stored as a single integer bitmask, so a whole domain can be checked
+    with one AND.
+
+    Attributes:
+        index (dict): Maps every value of the other variable to its bit position.
+        rows (dict): Maps every value of the owning variable to the bitmask of the other values it allows.
+    """
+
+    kind = "table"
+
+    def __init__(self, allowed: Iterable[Tuple[Hashable, Hashable]]) -> None:
+        """
+        Initializes a Table constraint.
+
+        Args:
+            allowed (iterable): The allowed (own value, other value) pairs; for a constraint added on [x, y], the
+                (x value, y value) pairs.
+        """
+        self.allowed = list(dict.fromkeys(allowed))
+        self._reversed = None
+        self.index = {}
+        self.rows = {}
+        for own, other in self.allowed:
+            bit = self.index.setdefault(other, len(self.index))
+            self.rows[own] = self.rows.get(own, 0) | 1 << bit
+
+    def __call__(self, other_value, own_value) -> bool:
+        bit = self.index.get(other_value)
+        return bit is not None and bool(self.rows.get(own_value, 0) >> bit & 1)
+
+    def reversed(self) -> "Table":
+        if self._reversed is None:
+            self._reversed = Table((other, own) for own, other in self.allowed)
+            self._reversed._reversed = self
+        return self._reversed
+
+    def mask(self, values: Iterable) -> int:
+        """
+        Returns the bitmask of the values of the other variable, ignoring values that appear in no allowed pair.
+        """
+        mask = 0
+        index = self.index
+        for value in values:
+            bit = index.get(value)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def supported(self, own_value, other_mask: int) -> bool:
+        """
+        Checks whether own_value is allowed with at least one value of the other variable in other_mask.
+        """
+        return bool(self.rows.get(own_value, 0) & other_mask)
+
+
+class NaryConstraint(object):
+    """
+    Base class of the constraints over more than two variables, stored in CSP.nary_constraints together with their
+    variables.
+
+    Methods:
+        check(values): Checks a complete tuple of values, in the order of the constraint's variables.
+        prune(variables, domains, assignments): Removes unsupported values; used by the solver after assignments.
+    """
+
+    kind = None
+
+    def check(self, values: Sequence) -> bool:
+        raise NotImplementedError
+
+    def prune(self, variables: Sequence[str], domains: Dict[str, List], assignments: Dict) -> Tuple[List[Tuple[str, object]], bool]:
+        """
+        Removes from the domains of the unassigned variables the values that cannot be extended to a tuple
+        satisfying the constraint.
+
+        Args:
+            variables (list): The variables of the constraint.
+            domains (dict): The current domains of the CSP, modified in place.
+            assignments (dict): The current assignments of the CSP.
+
+        Returns:
+            Tuple[list, bool]: The removed (variable, value) pairs, and False if the constraint can no longer be
+            satisfied.
+        """
+        unassigned = [var for var in variables if assignments[var] is None]
+        if len(unassigned) != 1:
+            return [], True
+        # Only the last free variable can be pruned without enumerating tuples
+        last = unassigned[0]
+        position = list(variables).index(last)
+        values = [assignments[var] for var in variables]
+        removed = []
+        for value in list(domains[last]):
+            values[position] = value
+            if not self.check(values):
+                domains[last].remove(value)
+                removed.append((last, value))
+        return removed, bool(domains[last])
+
+
+class AllDifferent(NaryConstraint):
+    """
+    All the variables take pairwise different values, for example the countries of a clique.
+
+    CSP.add_constraint also posts the pairwise not_equal arcs, so every search option handles it; prune() adds the
+    pigeonhole test on top: the free variables must have at least as many distinct values left as there are of
+    them.
+    """
+
+    kind = "all_different"
+
+    def check(self, values: Sequence) -> bool:
+        return len(set(values)) == len(values)
+
+    def prune(self, variables: Sequence[str], domains: Dict[str, List], assignments: Dict) -> Tuple[List[Tuple[str, object]], bool]:
+        unassigned = [var for var in variables if assignments[var] is None]
+        available = set()
+        for var in unassigned:
+            available.update(domains[var])
+            if len(available) >= len(unassigned):
+                return [], True
+        return [], len(available) >= len(unassigned)
+
+
+class Predicate(NaryConstraint):
+    """
+    Arbitrary constraint over several variables, given as a function of their values.
+    """
+
+    kind = "predicate"
+
+    def __init__(self, func: Callable[..., bool]) -> None:
+        """
+        Initializes a Predicate constraint.
+
+        Args:
+            func (function): Called with one value per variable, in the order of the constraint's variables.
+        """
+        self.func = func
+
+    def check(self, values: Sequence) -> bool:
+        return bool(self.func(*values))
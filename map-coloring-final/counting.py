@@ -0,0 +1,173 @@
+import time
+from typing import Dict, FrozenSet, List, Optional
+from CSP import CSP
+from components import connected_components
+from constraints import BinaryConstraint
+
+
+class _Stopped(Exception):
+    # Raised by _count when the budget runs out, unwinding every level without caching partial counts
+    pass
+
+
+def count_solutions(csp: CSP, cache: Optional[Dict] = None, max_nodes: Optional[int] = None,
+                    time_limit: Optional[float] = None) -> Optional[int]:
+    """
+    Counts the solutions of a CSP without enumerating them.
+
+    The count of a set of independent components is the product of their counts, so the problem is split into
+    connected components, and every component is counted by branching on its most constrained variable: once the
+    variable has a value, its neighbors lose the values that conflict with it and what is left of the component
+    often splits into independent pieces again. The count of every piece is cached by its variables and their
+    remaining domains, so a piece reached again through other branches is never counted twice. Counting stays
+    exponential in the worst case, but for maps, whose borders form narrow separators, it is far smaller than
+    the number of solutions.
+
+    Args:
+        csp (CSP): The problem. It is not modified; assigned variables count with their value only.
+        cache (dict, optional): Sub-results to reuse, for example across calls on problems sharing components.
+            Defaults to a new cache. The pieces counted before a cut-off stay in it, so a later call with a larger
+            budget resumes from them.
+        max_nodes (int, optional): Maximum number of values to branch on before giving up. Defaults to no limit.
+        time_limit (float, optional): Maximum number of seconds to count before giving up. Defaults to no limit.
+
+    Returns:
+        int: The number of solutions, or None if the budget ran out.
+
+    Raises:
+        ValueError: If the CSP has constraints over more than two variables other than AllDifferent, whose
+            pairwise arcs already express them.
+    """
+    for constraint, variables in csp.nary_constraints:
+        if constraint.kind != "all_different":
+            raise ValueError("counting does not support %s constraints over more than two variables" % constraint.kind)
+    if cache is None:
+        cache = {}
+
+    # For every variable, its neighbors with the constraints called as func(value of var, value of neighbor)
+    arcs = {var: {} for var in csp.variables}
+    for neighbor, constraints in csp.var_constraints.items():
+        if neighbor not in arcs:
+            continue
+        for func, var in constraints:
+            if var in arcs and var != neighbor:
+                arcs[var].setdefault(neighbor, []).append(func)
+                # A plain function is checked from both sides, and may not be symmetric; typed constraints are
+                # stored reversed for the other variable, so one side is enough
+                if not isinstance(func, BinaryConstraint):
+                    arcs[neighbor].setdefault(var, []).append(lambda own, other, func=func: func(other, own))
+    domains = {var: frozenset([csp.assignments[var]] if csp.assignments[var] is not None else csp.variables[var])
+               for var in csp.variables}
+
+    budget = {"nodes": max_nodes, "deadline": time.monotonic() + time_limit if time_limit is not None else None}
+    total = 1
+    try:
+        for component in connected_components(csp):
+            total *= _count(frozenset(component), domains, arcs, cache, budget)
+            if total == 0:
+                break
+    except _Stopped:
+        return None
+    return total
+
+
+def _pieces(variables: FrozenSet, arcs: Dict) -> List[FrozenSet]:
+    # Connected components of the subgraph induced by variables
+    pieces = []
+    seen = set()
+    for start in variables:
+        if start in seen:
+            continue
+        seen.add(start)
+        piece = [start]
+        for var in piece:  # The list grows while it is walked, like a queue
+            for neighbor in arcs[var]:
+                if neighbor in variables and neighbor not in seen:
+                    seen.add(neighbor)
+                    piece.append(neighbor)
+        pieces.append(frozenset(piece))
+    return pieces
+
+
+def _open(variables: FrozenSet, domains: Dict, arcs: Dict, cache: Dict):
+    # The number of solutions of the connected subproblem over variables if it is known without branching, else a
+    # new _count level: [cache key, variable branched on, iterator over its values, its neighbors in the rest, the
+    # rest, total so far, domains saved for the current value, iterator over the pieces the rest splits into under
+    # that value, product of the counts of the pieces done]
+    if len(variables) == 1:
+        return len(domains[next(iter(variables))])
+    key = frozenset((var, domains[var]) for var in variables)
+    if key in cache:
+        return cache[key]
+
+    # The variable with the fewest values, then the most neighbors left, splits the rest the most
+    var = min(variables, key=lambda v: (len(domains[v]), -sum(1 for n in arcs[v] if n in variables)))
+    rest = variables - {var}
+    neighbors = [neighbor for neighbor in arcs[var] if neighbor in rest]
+    return [key, var, iter(domains[var]), neighbors, rest, 0, None, None, 1]
+
+
+def _count(variables: FrozenSet, domains: Dict, arcs: Dict, cache: Dict, budget: Dict) -> int:
+    # Number of solutions of the connected subproblem over variables, with the given remaining domains. A branch
+    # counts smaller pieces, which on a chain of variables nests as deep as the chain is long, so the levels are
+    # kept on an explicit stack, as in iterative_solver, rather than on the Python call stack
+    level = _open(variables, domains, arcs, cache)
+    if not isinstance(level, list):
+        return level
+    stack = [level]
+    # Count of the level just finished, to multiply into the level below it
+    returned = None
+
+    while True:
+        level = stack[-1]
+        key, var, values, neighbors, rest = level[:5]
+        if returned is not None:
+            level[8] *= returned
+            returned = None
+        if level[7] is not None:
+            # Count the remaining pieces of the current value, descending into the first one that needs branching
+            pushed = False
+            if level[8]:
+                for piece in level[7]:
+                    count = _open(piece, domains, arcs, cache)
+                    if isinstance(count, list):
+                        stack.append(count)
+                        pushed = True
+                        break
+                    level[8] *= count
+                    if not level[8]:
+                        break
+            if pushed:
+                continue
+            domains.update(level[6])
+            level[5] += level[8]
+            level[7] = None
+
+        for value in values:
+            if budget["nodes"] is not None:
+                if budget["nodes"] <= 0:
+                    raise _Stopped()
+                budget["nodes"] -= 1
+            if budget["deadline"] is not None and time.monotonic() > budget["deadline"]:
+                raise _Stopped()
+            changed = {}
+            for neighbor in neighbors:
+                funcs = arcs[var][neighbor]
+                domain = frozenset(other for other in domains[neighbor] if all(func(value, other) for func in funcs))
+                if not domain:
+                    changed = None
+                    break
+                changed[neighbor] = domain
+            if changed is not None:
+                level[6] = {neighbor: domains[neighbor] for neighbor in changed}
+                domains.update(changed)
+                level[7] = iter(_pieces(rest, arcs))
+                level[8] = 1
+                break
+        else:
+            # Every value is counted
+            cache[key] = level[5]
+            stack.pop()
+            if not stack:
+                return level[5]
+            returned = level[5]
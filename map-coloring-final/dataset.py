@@ -0,0 +1,239 @@
+import csv
+import os
+import pickle
+import sys
+from typing import Dict, List, Optional
+
+DEFAULT_PATH = './countries_dataset.csv'
+CACHE_VERSION = 2
+
+_datasets = {}
+
+
+class Dataset(object):
+    """
+    Countries dataset loaded once per process.
+
+    The CSV is parsed with the standard library and the WKT geometries are kept as text; they are only parsed
+    (with shapely) for the continent that is actually drawn. A pickled cache next to the CSV stores the parsed
+    records and, once a continent has been drawn, its geometries as WKB. The cache is invalidated when the size
+    or modification time of the CSV changes.
+
+    Files without a neighbors column (for example municipalities or sales territories that only come with
+    polygons) are supported: the neighbor lists are then derived from the geometries with adjacency.py the
+    first time they are needed, and stored in the cache. Such files usually identify their regions with another
+    column than iso_a3, which is given as id_column.
+
+    Attributes:
+        path (str): Path of the CSV file.
+        id_column (str): The column identifying the regions.
+        workers (int): Number of processes deriving the neighbor lists.
+        records (list): One dictionary per country with the keys continent, country_name, iso_a3 and neighbors;
+            iso_a3 holds the value of id_column.
+        derived (bool): True if the neighbor lists are not in the file and must be derived from the geometries.
+        wkt (dict): Maps region identifiers to their geometry in WKT, for geometries not yet parsed.
+        wkb (dict): Maps region identifiers to their geometry in WKB, for continents already parsed.
+
+    Methods:
+        borders(continent): Returns the neighbor lists of the countries of a continent.
+        geometries(continent): Returns the parsed shapely geometries of the countries of a continent.
+        geodataframe(continent): Returns a GeoDataFrame of the countries of a continent.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, id_column: str = 'iso_a3', workers: Optional[int] = None) -> None:
+        """
+        Loads the dataset from the binary cache if it is up to date, from the CSV otherwise.
+
+        Args:
+            path (str, optional): Path of the countries CSV file. Defaults to './countries_dataset.csv'.
+            id_column (str, optional): The column identifying the regions. Defaults to 'iso_a3'.
+            workers (int, optional): Number of processes used to derive missing neighbor lists; the geometries
+                are queried in chunks, so small files stay in one process. Defaults to one per CPU.
+
+        Raises:
+            ValueError: If the file has no id_column column.
+        """
+        self.path = path
+        self.cache_path = path + '.cache'
+        self.id_column = id_column
+        self.workers = workers if workers is not None else os.cpu_count()
+        stat = os.stat(path)
+        self.signature = (CACHE_VERSION, stat.st_size, stat.st_mtime_ns, id_column)
+        self._geometries = {}
+        if not self._load_cache():
+            self._load_csv()
+            self._save_cache()
+
+
+    def _load_cache(self) -> bool:
+        try:
+            with open(self.cache_path, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return False
+        if cached.get('signature') != self.signature:
+            return False
+        self.records = cached['records']
+        self.wkb = cached['wkb']
+        self.derived = cached['derived']
+        self.wkt = None  # Only read from the CSV if a continent without WKB is drawn
+        return True
+
+
+    def _load_csv(self) -> None:
+        csv.field_size_limit(sys.maxsize)
+        self.records = []
+        self.wkt = {}
+        self.wkb = {}
+        with open(self.path, newline='') as f:
+            reader = csv.DictReader(f)
+            if self.id_column not in (reader.fieldnames or []):
+                raise ValueError("%s has no %s column" % (self.path, self.id_column))
+            self.derived = 'neighbors' not in reader.fieldnames
+            for row in reader:
+                region = row[self.id_column]
+                self.records.append({
+                    'continent': row.get('continent', ''),
+                    'country_name': row.get('country_name', region),
+                    'iso_a3': region,
+                    'neighbors': row['neighbors'].split(', ') if row.get('neighbors') else [],
+                })
+                self.wkt[region] = row['geometry']
+
+
+    def _save_cache(self) -> None:
+        try:
+            with open(self.cache_path + '.tmp', 'wb') as f:
+                pickle.dump({'signature': self.signature, 'records': self.records, 'wkb': self.wkb,
+                             'derived': self.derived}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.cache_path + '.tmp', self.cache_path)
+        except OSError:
+            pass  # A read-only dataset directory only costs the cache
+
+
+
+    def continents(self) -> List[str]:
+        """
+        Returns the names of the continents in the dataset.
+        """
+        return list(dict.fromkeys(record['continent'] for record in self.records))
+
+
+    def countries(self, continent: Optional[str] = None) -> List[dict]:
+        """
+        Returns the records of the countries of a continent, or of all countries.
+        """
+        return [record for record in self.records if continent is None or record['continent'] == continent]
+
+
+    def borders(self, continent: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Returns the neighbor lists of the countries of a continent. Neighbors in other continents are kept, as in
+        the CSV file.
+
+        Args:
+            continent (str, optional): The continent; all countries if omitted.
+
+        Returns:
+            dict: Maps each region identifier (ISO A3 code by default) to a new list of neighboring identifiers.
+        """
+        if self.derived:
+            self._derive_neighbors()
+        return {record['iso_a3']: list(record['neighbors']) for record in self.countries(continent)}
+
+
+    def _derive_neighbors(self) -> None:
+        from adjacency import derive_adjacency
+
+        geometries = self.geometries()
+        codes = [record['iso_a3'] for record in self.records]
+        borders = derive_adjacency(codes, [geometries[code] for code in codes], workers=self.workers,
+                                   cache_dir=os.path.dirname(os.path.abspath(self.path)))
+        for record in self.records:
+            record['neighbors'] = borders[record['iso_a3']]
+        self.derived = False
+        self._save_cache()
+
+
+    def geometries(self, continent: Optional[str] = None) -> Dict[str, object]:
+        """
+        Returns the shapely geometries of the countries of a continent, parsing them on first use. Newly parsed
+        geometries are added to the binary cache as WKB.
+
+        Args:
+            continent (str, optional): The continent; all countries if omitted.
+
+        Returns:
+            dict: Maps each region identifier to its shapely geometry.
+        """
+        from shapely import wkb, wkt
+
+        codes = [record['iso_a3'] for record in self.countries(continent)]
+        missing = [code for code in codes if code not in self._geometries]
+        if missing:
+            added = False
+            for code in missing:
+                if code in self.wkb:
+                    self._geometries[code] = wkb.loads(self.wkb[code])
+                else:
+                    if self.wkt is None:
+                        self._load_wkt()
+                    geometry = wkt.loads(self.wkt[code])
+                    self._geometries[code] = geometry
+                    self.wkb[code] = geometry.wkb
+                    added = True
+            if added:
+                self._save_cache()
+        return {code: self._geometries[code] for code in codes}
+
+
+    def _load_wkt(self) -> None:
+        csv.field_size_limit(sys.maxsize)
+        with open(self.path, newline='') as f:
+            self.wkt = {row[self.id_column]: row['geometry'] for row in csv.DictReader(f)}
+
+
+    def geodataframe(self, continent: Optional[str] = None):
+        """
+        Returns a GeoDataFrame with the columns of the CSV file for the countries of a continent.
+
+        Args:
+            continent (str, optional): The continent; all countries if omitted.
+
+        Returns:
+            gpd.GeoDataFrame: The countries, with parsed geometries.
+        """
+        import geopandas as gpd
+
+        countries = self.countries(continent)
+        geometries = self.geometries(continent)
+        return gpd.GeoDataFrame({
+            'continent': [record['continent'] for record in countries],
+            'country_name': [record['country_name'] for record in countries],
+            'iso_a3': [record['iso_a3'] for record in countries],
+            'neighbors': [', '.join(record['neighbors']) for record in countries],
+            'geometry': [geometries[record['iso_a3']] for record in countries],
+        }, geometry='geometry')
+
+
+
+def load_dataset(path: str = DEFAULT_PATH, id_column: str = 'iso_a3', workers: Optional[int] = None) -> Dataset:
+    """
+    Returns the dataset stored at path, loading it only the first time it is requested in this process.
+
+    Args:
+        path (str, optional): Path of the countries CSV file. Defaults to './countries_dataset.csv'.
+        id_column (str, optional): The column identifying the regions. Defaults to 'iso_a3'.
+        workers (int, optional): Number of processes used to derive missing neighbor lists. Defaults to one per CPU.
+
+    Returns:
+        Dataset: The loaded dataset.
+    """
+    key = (os.path.abspath(path), id_column)
+    stat = os.stat(path)
+    dataset = _datasets.get(key)
+    if dataset is None or dataset.signature[1:3] != (stat.st_size, stat.st_mtime_ns):
+        dataset = _datasets[key] = Dataset(path, id_column, workers)
+    elif workers is not None:
+        dataset.workers = workers
+    return dataset
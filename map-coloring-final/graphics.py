@@ -1,8 +1,85 @@
+import os
 import geopandas as gpd
-import pandas as pd
-from shapely import wkt
-from typing import Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 import matplotlib.pyplot as plt
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from dataset import load_dataset
+
+
+_layers = {}
+
+
+class ContinentLayer(object):
+    """
+    Everything needed to draw a continent that does not depend on the solution, computed once per process.
+
+    Attributes:
+        gdf (gpd.GeoDataFrame): The countries of the continent, with parsed geometries.
+        codes (list): The ISO A3 codes, in the order of the rows of gdf.
+        centroids (list): The (x, y) centroid of every country, in the same order.
+        parts (list): The number of polygons drawn for every country, in the same order (one per part of a
+            MultiPolygon, none for a missing geometry).
+        xlim (tuple): The horizontal extent of the map.
+        ylim (tuple): The vertical extent of the map.
+        text_position (tuple): Where the assignment number is written.
+    """
+
+    def __init__(self, continent: str, gdf: gpd.GeoDataFrame) -> None:
+        """
+        Initializes a ContinentLayer object.
+
+        Args:
+            continent (str): The name of the continent.
+            gdf (gpd.GeoDataFrame): The countries of the continent.
+        """
+        self.gdf = gdf
+        self.codes = list(gdf['iso_a3'])
+        self.parts = [0 if geom is None or geom.is_empty else len(geom.geoms) if geom.geom_type.startswith('Multi') else 1
+                      for geom in gdf.geometry]
+        centroids = gdf.geometry.centroid
+        self.centroids = list(zip(centroids.x, centroids.y))
+        minx, miny, maxx, maxy = gdf.total_bounds
+        if continent == "Europe":
+            self.xlim, self.ylim = (-40, 60), (35, 80)
+            self.text_position = (-40, 82)
+        else:
+            self.xlim, self.ylim = (minx - 1, maxx + 1), (miny - 1, maxy + 1)
+            self.text_position = (minx, maxy + 2)
+
+
+def continent_layer(continent: str) -> ContinentLayer:
+    """
+    Returns the cached drawing data of a continent, loading it from the shared dataset the first time.
+
+    Args:
+        continent (str): The name of the continent.
+
+    Returns:
+        ContinentLayer: The countries, centroids and bounds of the continent.
+    """
+    if continent not in _layers:
+        _layers[continent] = ContinentLayer(continent, load_dataset().geodataframe(continent))
+    return _layers[continent]
+
+
+def country_colors(layer: ContinentLayer, solution: Optional[Dict[str, str]]) -> List[Tuple[float, float, float, float]]:
+    """
+    Returns the RGBA color of every country of a layer; countries without a color are light grey.
+    """
+    if solution is None:
+        solution = {}
+    return [to_rgba(solution.get(code, 'lightgrey')) for code in layer.codes]
+
+
+def polygon_colors(layer: ContinentLayer, solution: Optional[Dict[str, str]]) -> List[Tuple[float, float, float, float]]:
+    """
+    Returns the RGBA color of every polygon drawn for a layer: geopandas draws one path per part of a MultiPolygon,
+    so each country's color is repeated once per part.
+    """
+    return [color for color, parts in zip(country_colors(layer, solution), layer.parts) for _ in range(parts)]
+
 
 def draw_colored_map(solution: Dict[str, str], gdf: gpd.GeoDataFrame, continent: str, assignments_number: int) -> None:
     """
@@ -17,50 +94,108 @@ def draw_colored_map(solution: Dict[str, str], gdf: gpd.GeoDataFrame, continent:
         continent (str): The name of the continent to visualize.
         assignments_number (int): The number of variable assignments made during the solution process.
     """
-    # Filter for the selected continent and assign colors
-    selected_continent = gdf[gdf['continent'] == continent].copy()
-    #selected_continent['color'] = selected_continent['iso_a3'].apply(lambda x: solution.get(x, 'lightgrey'))
-    if solution is not None:
-        selected_continent['color'] = selected_continent['iso_a3'].apply(lambda x: solution.get(x, 'lightgrey'))
-    else:
-        selected_continent['color'] = 'lightgrey'
+    layer = _layers.get(continent)
+    if layer is None or layer.gdf is not gdf:
+        layer = ContinentLayer(continent, gdf[gdf['continent'] == continent])
 
-    
     fig, ax = plt.subplots(1, figsize=(12, 12))
-    selected_continent.plot(ax=ax, color=selected_continent['color'], edgecolor='black')
-    
-    # Set map boundaries
-    minx, miny, maxx, maxy = selected_continent.total_bounds
-    if continent == "Europe":
-        ax.set_xlim(-40, 60)
-        ax.set_ylim(35, 80)
-        text_x, text_y = -40, 82
-    else:
-        ax.set_xlim(minx - 1, maxx + 1)
-        ax.set_ylim(miny - 1, maxy + 1)
-        text_x, text_y = minx, maxy + 2
+    layer.gdf.plot(ax=ax, color=country_colors(layer, solution), edgecolor='black')
+    ax.set_xlim(*layer.xlim)
+    ax.set_ylim(*layer.ylim)
 
     # Annotate countries and display the assignment number
-    for idx, row in selected_continent.iterrows():
-        if row['iso_a3'] in solution:
-            plt.text(row.geometry.centroid.x, row.geometry.centroid.y, row['iso_a3'], fontsize=6, ha='center', va='center')
-    plt.text(text_x, text_y, f"Assignment Number: {assignments_number}", fontsize=12, ha='left', va='center')
+    for code, (x, y) in zip(layer.codes, layer.centroids):
+        if solution is not None and code in solution:
+            plt.text(x, y, code, fontsize=6, ha='center', va='center')
+    plt.text(*layer.text_position, f"Assignment Number: {assignments_number}", fontsize=12, ha='left', va='center')
     plt.show()
 
-def draw(continent: str, solution: Dict[str, str], assignments_number: int) -> None:
+
+def render_solutions(continent: str, solutions: Sequence[Optional[Dict[str, str]]], assignments_numbers: Sequence[int],
+                     paths: Sequence[str], dpi: int = 100) -> None:
+    """
+    Renders several solutions of the same continent to image files without a display (Agg/SVG backends, no
+    pyplot state). The figure, the country polygons and the labels are set up once; for every solution only the
+    face colors, the visible labels and the assignment number change before the figure is saved.
+
+    Args:
+        continent (str): The name of the continent.
+        solutions (list): The solutions (dictionaries from ISO A3 code to color, or None).
+        assignments_numbers (list): The assignment number written on every map.
+        paths (list): The output file of every map; the format (PNG, SVG, PDF, ...) follows the extension.
+        dpi (int, optional): Resolution of raster images. Defaults to 100.
+
+    Returns:
+        None
+    """
+    layer = continent_layer(continent)
+    fig = Figure(figsize=(12, 12))
+    ax = fig.subplots()
+    layer.gdf.plot(ax=ax, color='lightgrey', edgecolor='black')
+    polygons = ax.collections[0]
+    if len(polygons.get_paths()) != sum(layer.parts):
+        # Face colors are matched to paths by position; matplotlib would silently cycle a list of the wrong length
+        raise ValueError("%s is drawn with %d polygons, expected %d" % (continent, len(polygons.get_paths()), sum(layer.parts)))
+    ax.set_xlim(*layer.xlim)
+    ax.set_ylim(*layer.ylim)
+    labels = [ax.text(x, y, code, fontsize=6, ha='center', va='center') for code, (x, y) in zip(layer.codes, layer.centroids)]
+    title = ax.text(*layer.text_position, "", fontsize=12, ha='left', va='center')
+
+    for solution, assignments_number, path in zip(solutions, assignments_numbers, paths):
+        polygons.set_facecolor(polygon_colors(layer, solution))
+        for code, label in zip(layer.codes, labels):
+            label.set_visible(solution is not None and code in solution)
+        title.set_text(f"Assignment Number: {assignments_number}")
+        fig.savefig(path, dpi=dpi)
+
+
+def _render_group(continent: str, jobs: List[Tuple[Optional[Dict[str, str]], int, str]], dpi: int) -> List[str]:
+    solutions, assignments_numbers, paths = zip(*jobs)
+    render_solutions(continent, solutions, assignments_numbers, paths, dpi)
+    return list(paths)
+
+
+def render_batch(jobs: Sequence[Tuple[str, Optional[Dict[str, str]], int, str]], workers: Optional[int] = None, dpi: int = 100) -> List[str]:
     """
-    Loads geographic data from a CSV file, transforms it into a GeoDataFrame, and then visualizes the map coloring
-    solution for a specific continent. This function serves as a high-level interface to prepare data and call
-    draw_colored_map with appropriate parameters.
+    Renders many maps to files. Jobs are grouped by continent, so every continent's layer and figure are built
+    once per process; with workers > 1 the groups are rendered in parallel processes.
+
+    Args:
+        jobs (list): (continent, solution, assignments_number, path) tuples.
+        workers (int, optional): Number of worker processes. Defaults to rendering in this process.
+        dpi (int, optional): Resolution of raster images. Defaults to 100.
+
+    Returns:
+        List[str]: The paths written.
+    """
+    groups = {}
+    for continent, solution, assignments_number, path in jobs:
+        groups.setdefault(continent, []).append((solution, assignments_number, path))
+
+    if workers is not None and workers > 1 and len(groups) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups))) as executor:
+            futures = [executor.submit(_render_group, continent, group, dpi) for continent, group in groups.items()]
+            return [path for future in futures for path in future.result()]
+    return [path for continent, group in groups.items() for path in _render_group(continent, group, dpi)]
+
+
+def draw(continent: str, solution: Dict[str, str], assignments_number: int, output: Optional[str] = None) -> None:
+    """
+    Loads the geographic data of a continent from the shared dataset, parsing only that continent's geometries,
+    and then visualizes the map coloring solution for it. This function serves as a high-level interface to
+    prepare data and call draw_colored_map with appropriate parameters.
 
     Args:
         continent (str): The name of the continent for which the map coloring solution should be visualized.
         solution (Dict[str, str]): A dictionary where each key is a country's ISO A3 code and its value is the color
                                    assigned to that country as part of the map coloring solution.
         assignments_number (int): The number of assignments made during the solution of the map coloring problem.
+        output (str, optional): Image file to write instead of opening a window, e.g. "asia.png" or "asia.svg".
     """
-    neighbors_df = pd.read_csv('./countries_dataset.csv')
-    neighbors_df['geometry'] = neighbors_df['geometry'].apply(wkt.loads)
-    gdf = gpd.GeoDataFrame(neighbors_df, geometry='geometry')
-    
-    draw_colored_map(solution, gdf, continent, assignments_number)
\ No newline at end of file
+    if output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        render_solutions(continent, [solution], [assignments_number], [output])
+        return
+
+    layer = continent_layer(continent)
+    draw_colored_map(solution, layer.gdf, continent, assignments_number)
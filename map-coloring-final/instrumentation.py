@@ -0,0 +1,133 @@
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class Instrumentation(object):
+    """
+    Counters, phase timers and event hooks of a solver run.
+
+    A Solver only updates its instrumentation when it has one, so a run without it pays a single "is None" test
+    per node. Several solvers (for example one per connected component) can share the same object, in which case
+    the counters add up.
+
+    Attributes:
+        nodes (int): Number of assignments tried.
+        consistency_checks (int): Number of times a value was checked against the assigned neighbors.
+        arc_revisions (int): Number of arcs revised by MAC or AC-3.
+        values_pruned (int): Number of values removed from the domains of other variables by propagation.
+        backtracks (int): Number of assignments undone.
+        max_depth (int): Largest number of variables assigned by the search at the same time.
+        timers (dict): Seconds spent in every phase.
+
+    Methods:
+        phase(name): Context manager adding the time spent in its block to timers[name].
+        add_hook(event, callback): Calls callback(event, variable, value, depth) on every "assign" or "backtrack".
+        as_dict(): Returns the counters and timers.
+    """
+
+    def __init__(self, trace=None, sample: int = 1) -> None:
+        """
+        Initializes an Instrumentation object.
+
+        Args:
+            trace (file or callable, optional): Sink receiving one JSON line (file) or one dictionary (callable) per
+                sampled assign/backtrack event. Defaults to no trace.
+            sample (int, optional): Only every sample-th event is traced. Defaults to 1 (every event).
+        """
+        self.nodes = 0
+        self.consistency_checks = 0
+        self.arc_revisions = 0
+        self.values_pruned = 0
+        self.backtracks = 0
+        self.depth = 0
+        self.max_depth = 0
+        self.timers = {}
+        self.hooks = {}
+        self.trace = trace
+        self.sample = max(1, sample)
+        self.events = 0
+
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Adds the time spent in the with-block to timers[name].
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+
+
+    def add_hook(self, event: str, callback: Callable) -> None:
+        """
+        Registers a callback for an event.
+
+        Args:
+            event (str): "assign" or "backtrack".
+            callback (function): Called as callback(event, variable, value, depth).
+
+        Returns:
+            None
+        """
+        self.hooks.setdefault(event, []).append(callback)
+
+
+    def assigned(self, variable, value, pruned: int) -> None:
+        """
+        Records an assignment made by the search and the number of values its propagation removed.
+        """
+        self.nodes += 1
+        self.values_pruned += pruned
+        self.depth += 1
+        if self.depth > self.max_depth:
+            self.max_depth = self.depth
+        if self.hooks or self.trace is not None:
+            self.emit("assign", variable, value)
+
+
+    def retracted(self, variable, value) -> None:
+        """
+        Records an assignment undone by the search.
+        """
+        self.backtracks += 1
+        self.depth -= 1
+        if self.hooks or self.trace is not None:
+            self.emit("backtrack", variable, value)
+
+
+    def emit(self, event: str, variable, value) -> None:
+        """
+        Calls the hooks registered for event and writes the event to the trace if it is sampled.
+        """
+        for callback in self.hooks.get(event, ()):
+            callback(event, variable, value, self.depth)
+        if self.trace is not None:
+            self.events += 1
+            if self.events % self.sample == 0:
+                record = {"event": event, "variable": variable, "value": value, "depth": self.depth, "node": self.nodes}
+                if callable(self.trace):
+                    self.trace(record)
+                else:
+                    self.trace.write(json.dumps(record, default=str) + "\n")
+
+
+    def as_dict(self) -> Dict:
+        """
+        Returns the counters and the phase timers.
+
+        Returns:
+            dict: nodes, consistency_checks, arc_revisions, values_pruned, backtracks, max_depth and timers.
+        """
+        return {
+            "nodes": self.nodes,
+            "consistency_checks": self.consistency_checks,
+            "arc_revisions": self.arc_revisions,
+            "values_pruned": self.values_pruned,
+            "backtracks": self.backtracks,
+            "max_depth": self.max_depth,
+            "timers": dict(self.timers),
+        }
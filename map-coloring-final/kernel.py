@@ -0,0 +1,134 @@
+from typing import Dict, List, Optional, Tuple
+from CSP import CSP, not_equal
+from constraints import BinaryConstraint
+from Solver import Solver
+
+
+def peel_low_degree(csp: CSP) -> Tuple[List[str], List[str]]:
+    """
+    Removes, as long as there is one, an unassigned variable with fewer remaining neighbors than values in its
+    domain. Whatever its neighbors end up with, such a variable always has a value left, so it can be colored
+    after the rest of the graph. Plain constraint functions are assumed to mean "values must differ", as in map
+    coloring; variables with other typed constraints (equal, Table) or with constraints over more than two
+    variables other than AllDifferent are never peeled.
+
+    Args:
+        csp (CSP): The problem to reduce. It is not modified.
+
+    Returns:
+        Tuple[list, list]: The unassigned variables of the remaining core, and the peeled variables in the order
+        they were removed (color_peeled colors them in reverse).
+    """
+    neighbors = {var: {neighbor for func, neighbor in csp.var_constraints.get(var, []) if neighbor in csp.variables and neighbor != var}
+                 for var in csp.unassigned_var}
+    degree = {var: len(adjacent) for var, adjacent in neighbors.items()}
+    pinned = set()
+    for var in csp.unassigned_var:
+        if any(isinstance(func, BinaryConstraint) and func is not not_equal for func, neighbor in csp.var_constraints.get(var, [])):
+            pinned.add(var)
+    for constraint, variables in csp.nary_constraints:
+        if constraint.kind != "all_different":
+            pinned.update(variables)
+    queue = [var for var in csp.unassigned_var if var not in pinned and degree[var] < len(csp.variables[var])]
+    peeled = []
+    removed = set(queue) | pinned
+    for var in queue:  # The list grows while it is walked, like a queue
+        peeled.append(var)
+        for neighbor in neighbors[var]:
+            if neighbor in degree and neighbor not in removed:
+                degree[neighbor] -= 1
+                if degree[neighbor] < len(csp.variables[neighbor]):
+                    removed.add(neighbor)
+                    queue.append(neighbor)
+    core = [var for var in csp.unassigned_var if var not in removed or var in pinned]
+    return core, peeled
+
+
+def color_peeled(csp: CSP, peeled: List[str]) -> bool:
+    """
+    Colors the peeled variables greedily, last peeled first, with the first value consistent with the assigned
+    neighbors. The core must already be assigned.
+
+    Args:
+        csp (CSP): The problem, with its core assigned; the peeled variables are assigned in place.
+        peeled (list): The variables returned by peel_low_degree.
+
+    Returns:
+        bool: True if every variable got a value (always the case for "values must differ" constraints).
+    """
+    assignments = csp.assignments
+    for var in reversed(peeled):
+        for value in csp.variables[var]:
+            if all(assignments[neighbor] is None or func(assignments[neighbor], value)
+                   for func, neighbor in csp.var_constraints.get(var, [])):
+                break
+        else:
+            return False
+        assignments[var] = value
+        csp.variables[var] = [value]
+        csp.assignments_number += 1
+    csp.unassigned_var = [var for var in csp.unassigned_var if assignments[var] is None]
+    return True
+
+
+def solve_with_peeling(csp: CSP, solver_options: Optional[Dict] = None, engine: str = "backtrack",
+                       max_nodes: Optional[int] = None, time_limit: Optional[float] = None) -> Tuple[Optional[Dict[str, str]], Dict]:
+    """
+    Peels the low-degree variables, searches only the remaining core and then colors the peeled variables
+    greedily in reverse order. On real maps most countries are peeled, so the solver only sees the hard part.
+    Variables that are already assigned stay fixed: the core is searched together with its assigned neighbors,
+    and the values conflicting with them are removed from the core domains first.
+
+    Args:
+        csp (CSP): The problem to solve; the solution is stored in it.
+        solver_options (dict, optional): Keyword arguments of the Solver used for the core. Defaults to none.
+        engine (str, optional): "backtrack", "iterative" or "cbj". Defaults to "backtrack".
+        max_nodes (int, optional): Assignment budget of the iterative and cbj engines.
+        time_limit (float, optional): Time budget in seconds of the iterative and cbj engines.
+
+    Returns:
+        Tuple[dict, dict]: The assignments (None if the core has no solution or the budget ran out, in which case
+        only csp.assignments_number is changed, or if the peeled variables could not be colored consistently) and
+        statistics (assignments_number, stopped, backjumps, nogood_hits, core, peeled).
+    """
+    core, peeled = peel_low_degree(csp)
+    stats = {"core": len(core), "peeled": len(peeled), "assignments_number": 0, "stopped": False,
+             "backjumps": 0, "nogood_hits": 0}
+
+    if core:
+        # The assigned neighbors of the core are kept as fixed variables, so that the constraints to them still hold
+        core_set = set(core)
+        fixed = {neighbor for var in core for func, neighbor in csp.var_constraints.get(var, [])
+                 if neighbor not in core_set and csp.assignments.get(neighbor) is not None}
+        for var in core:
+            for index in csp.var_nary.get(var, ()):
+                fixed.update(other for other in csp.nary_constraints[index][1] if csp.assignments.get(other) is not None)
+        subproblem = csp.subproblem(core + sorted(fixed - core_set))
+        # Values in conflict with a fixed neighbor are removed before the search, which never revisits fixed variables
+        for var in core:
+            for func, neighbor in subproblem.var_constraints.get(var, []):
+                if neighbor in fixed:
+                    value = subproblem.assignments[neighbor]
+                    subproblem.variables[var] = [own for own in subproblem.variables[var] if func(value, own)]
+        solver = Solver(csp=subproblem, **(solver_options or {}))
+        if engine == "cbj":
+            result = solver.cbj_solver(max_nodes=max_nodes, time_limit=time_limit)
+        elif engine == "iterative":
+            result = solver.iterative_solver(max_nodes=max_nodes, time_limit=time_limit)
+        else:
+            result = solver.backtrack_solver()
+        stats.update(assignments_number=subproblem.assignments_number, stopped=solver.stopped,
+                     backjumps=solver.backjumps, nogood_hits=solver.nogood_hits)
+        csp.assignments_number += subproblem.assignments_number
+        if result is None:
+            return None, stats
+        for var in core:
+            csp.assignments[var] = result[var]
+            csp.variables[var] = [result[var]]
+
+    before = csp.assignments_number
+    colored = color_peeled(csp, peeled)
+    stats["assignments_number"] += csp.assignments_number - before
+    # The combined assignment is only returned if it satisfies every constraint of the core and peeled variables
+    colored = colored and all(csp.is_consistent(var, csp.assignments[var]) for var in core + peeled)
+    return (csp.assignments if colored else None), stats
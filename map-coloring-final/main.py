@@ -1,13 +1,19 @@
 import argparse
+import contextlib
+import functools
+import json
+import sys
 from enum import Enum
 from CSP import CSP
 from Solver import Solver
-from map_generator import generate_borders_by_continent
-from graphics import draw
-import random
-from collections import deque
-import matplotlib.pyplot as plt
-import numpy as np
+from neighborhood import emit_constraints, neighborhood_graph
+from chromatic import minimum_colors
+from components import solve_by_components
+from kernel import solve_with_peeling
+from LocalSearch import LocalSearch
+from counting import count_solutions
+from instrumentation import Instrumentation
+from dataset import load_dataset
 
 
 class Continent(Enum):
@@ -18,7 +24,51 @@ class Continent(Enum):
 
     def __str__(self):
         return self.value
-    
+
+
+#defult Number of colors to generate
+num_colors = 3
+
+
+def build_csp(graph, colors):
+    """
+    Creates a CSP in which every pair of neighboring countries must get different colors.
+
+    Args:
+        graph (dict): Maps each country to the countries it must differ from.
+        colors (list): The colors available to every country.
+
+    Returns:
+        CSP: The map coloring problem.
+    """
+    csp = CSP()
+    countries = list(graph.keys())
+    emit_constraints(csp, graph)
+
+    for country in countries:
+        csp.add_variable(country,list(colors))
+    return csp
+
+
+def palette(colors_number, draw_map=True):
+    """
+    Returns colors_number colors spread over the matplotlib 'tab20' colormap. Without a map to draw, the colors
+    are just numbered 0..colors_number-1, so matplotlib is never imported.
+
+    Args:
+        colors_number (int): The number of colors.
+        draw_map (bool, optional): Whether the colors will be drawn. Defaults to True.
+
+    Returns:
+        list: The colors, as RGBA tuples or numbers.
+    """
+    if not draw_map:
+        return list(range(colors_number))
+    import matplotlib.pyplot as plt
+
+    cmap = plt.get_cmap('tab20')
+    return [cmap(i / max(1, colors_number - 1)) for i in range(colors_number)]
+
 
 def main():
     """
@@ -31,6 +81,21 @@ def main():
     - -lcv, --lcv: Enable least constraint value (LCV) as an order-type optimizer.
     - -mrv, --mrv: Enable minimum remaining values (MRV) as an order-type optimizer.
     - -ac3, --arc-consistency: Enable arc consistency as a mechanism to eliminate the domain of variables achieving an optimized solution.
+    - -fc, --forward-checking: Enable forward checking, pruning the assigned color from the domains of unassigned neighbors.
+    - -mac, --maintain-arc-consistency: Enable incremental arc consistency (MAC) after every assignment.
+    - -dsatur, --dsatur: Select variables DSATUR-style from a priority queue (fewest remaining values, most unassigned neighbors).
+    - -cbj, --backjumping: Use conflict-directed backjumping, optionally with a bounded nogood store (--nogoods N).
+    - -it, --iterative: Use the non-recursive search engine, optionally bounded by --max-nodes and --time-limit.
+    - -ls, --local-search: Use min-conflicts/tabu local search from a DSATUR coloring, bounded by --max-nodes moves (default 100 per country) and --time-limit.
+    - -min, --min-colors: Find the minimum number of colors with clique/DSATUR bounds instead of adding one color at a time.
+    - -pf, --portfolio: Race several solver configurations (and --restarts randomized orderings) in --workers processes.
+    - -sb, --symmetry-breaking: Never try more than one of the colors no country uses yet.
+    - -cc, --components: Solve every connected component separately, optionally in --workers processes.
+    - -peel, --peeling: Search only the core left after repeatedly removing countries with fewer neighbors than colors.
+    - --count: Count the colorings with the final number of colors.
+    - --no-draw: Only solve: print the assignment and the statistics as one JSON object, without importing the plotting libraries.
+    - -o, --output: Write the map to an image file (PNG, SVG, ...) with a headless backend instead of showing it.
+    - --stats text|json: Print search counters and load/graph/build/search/render timers; --trace FILE writes sampled search events.
     - -ND, --Neighborhood-distance: The value determines the threshold for neighboring regions' similarity in color, with a default of 1 ensuring adjacent regions have distinct colors; increasing it, for instance to 2, extends this dissimilarity to the neighbors of neighbors.
     """
     parser = argparse.ArgumentParser(
@@ -63,6 +128,102 @@ def main():
         action="store_true",
         help="Enable arc consistency as a mechanism to eliminate the domain of variables achieving an optimized solution"
     )
+    parser.add_argument(
+        "-fc",
+        "--forward-checking",
+        action="store_true",
+        help="Enable forward checking, removing each assigned color from the domains of unassigned neighbors and backtracking as soon as one becomes empty"
+    )
+    parser.add_argument(
+        "-mac",
+        "--maintain-arc-consistency",
+        action="store_true",
+        help="Enable maintaining arc consistency (MAC): after every assignment only the arcs pointing at the assigned variable are revised, using residual supports"
+    )
+    parser.add_argument(
+        "-dsatur",
+        "--dsatur",
+        action="store_true",
+        help="Enable DSATUR variable ordering: fewest remaining values first, ties broken by the most unassigned neighbors, kept in an incrementally updated priority queue"
+    )
+    parser.add_argument(
+        "-cbj",
+        "--backjumping",
+        action="store_true",
+        help="Use conflict-directed backjumping: on failure jump back to the most recent variable involved in the conflict"
+    )
+    parser.add_argument(
+        "--nogoods",
+        type=int,
+        default=0,
+        help="Number of learned nogoods kept by conflict-directed backjumping (least recently used are evicted)"
+    )
+    parser.add_argument(
+        "-it",
+        "--iterative",
+        action="store_true",
+        help="Use the non-recursive search engine, which is not limited by Python's recursion limit"
+    )
+    parser.add_argument(
+        "-ls",
+        "--local-search",
+        action="store_true",
+        help="Use min-conflicts local search with a tabu list instead of backtracking; it cannot prove that there is no solution, so it is always bounded by --max-nodes moves (default 100 per country) and --time-limit"
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=None,
+        help="Stop the iterative or backjumping search after this many assignments"
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="Stop the iterative or backjumping search after this many seconds"
+    )
+    parser.add_argument(
+        "-min",
+        "--min-colors",
+        action="store_true",
+        help="Find the minimum number of colors: a greedy clique and a DSATUR coloring bound the answer and only the gap between them is searched (--max-nodes bounds each step)"
+    )
+    parser.add_argument(
+        "-pf",
+        "--portfolio",
+        action="store_true",
+        help="Run several heuristic configurations in parallel processes and keep the first one that finishes"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes for --portfolio (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--restarts",
+        type=int,
+        default=0,
+        help="Number of randomized value orderings per configuration for --portfolio"
+    )
+    parser.add_argument(
+        "-sb",
+        "--symmetry-breaking",
+        action="store_true",
+        help="Try a color nobody uses yet only once instead of once per unused color; mostly speeds up proving that a palette is too small"
+    )
+    parser.add_argument(
+        "-cc",
+        "--components",
+        action="store_true",
+        help="Solve every connected component of the map separately (in --workers processes if given); isolated countries are colored without search"
+    )
+    parser.add_argument(
+        "-peel",
+        "--peeling",
+        action="store_true",
+        help="Set aside countries with fewer neighbors than colors, search only the remaining core and color the others greedily afterwards"
+    )
     parser.add_argument(
         "-ND",
         "--Neighborhood-distance",
@@ -70,151 +231,194 @@ def main():
         default=1,
         help="The value determines the threshold for neighboring regions' similarity in color, with a default of 1 ensuring adjacent regions have distinct colors; increasing it, for instance to 2, extends this dissimilarity to the neighbors of neighbors."
     )
-    
-#defult Number of colors to generate
-num_colors = 3
 
-"""     # Generate num_colors random colors using a matplotlib color map
-    cmap = plt.cm.get_cmap('tab20')  # You can choose any other color map as well
-    random_colors_matplotlib = [cmap(i) for i in np.linspace(0, 1, num_colors)]
-    #print(random_colors_matplotlib)
-    
-   
-   
-   
-    def bfs_with_distance(graph, start, max_distance):
-        visited = set()
-        queue = [(start, 0)]
-        neighbors_within_distance = []
-        
-        while queue:
-            node, distance = queue.pop(0)
-            if distance > max_distance:
-                break
-            if node not in visited:
-                visited.add(node)
-                if distance <= max_distance:
-                    neighbors_within_distance.append(node)
-                for neighbor in graph[node]:
-                    if neighbor not in visited:
-                        queue.append((neighbor, distance + 1))
-        
-        return neighbors_within_distance """
-
-   
-   
-args = parser.parse_args()
-borders = generate_borders_by_continent(continent=str(args.map))
-print(borders)
-    
-    
-graph = borders
-#handling missing countries
-keys_to_add = []
-for country, neighbors in graph.items():
-    for neighbor in neighbors:
-        if neighbor not in graph:
-            keys_to_add.append(neighbor)
-# Add the missing keys
-for key in keys_to_add:
-    graph[key] = []
-        
-    
-                
-    
-"""     max_distance = args.Neighborhood_distance #based on client n
-    #max_distance=
-    
-    results_dict = {}
-    for country in graph:
-        #results_dict[country] =bfs_with_distance(graph, country, max_distance)
-        results_dict[country] = list(bfs_with_distance(graph, country, max_distance))
-    
-    # Remove the country from its own list of values 
-    for country in borders :   
-           results_dict[country].remove(country)
-            
-
-    
-    # print("---------------------------")
-    # print(results_dict)
- """
-   
- 
-    
-"""     # # Create a CSP instance with the generated borders
-    csp = CSP()
-    
-    
-    #init
-    if max_distance == 1: 
-        countries=list(borders.keys())
-        # print("%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%%")
-        constraint_func = lambda x,y : x!= y
-        for country in countries:
-                neighbor_removed = []
-                for neighbor in borders[country]:
-                    if neighbor not in countries:
-                        neighbor_removed.append(neighbor)
-                    else:
-                        csp.add_constraint(constraint_func,[country,neighbor])
-                        csp.constraints.append((country,neighbor))
-
-                borders[country] =[i for i in borders[country] if i not in neighbor_removed]
-            
-        for country in countries:
-                csp.add_variable(country,["red","blue","green","yellow"])
-                csp.assignments[country] = None
-    
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="Also count every coloring with the final number of colors, multiplying the counts of independent parts of the map instead of enumerating them; stops after --max-nodes branches (default 100000) or --time-limit"
+    )
+    parser.add_argument(
+        "--no-draw",
+        action="store_true",
+        help="Do not draw the map; print the assignment and the statistics as one JSON object on standard output"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Write the map to this image file (PNG, SVG, ... by extension) without opening a window"
+    )
+
+    parser.add_argument(
+        "--stats",
+        choices=["text", "json"],
+        default=None,
+        help="Collect search counters (nodes, consistency checks, arc revisions, pruned values, backtracks, maximum depth) and phase timers, and print them as text or as one JSON object"
+    )
+    parser.add_argument(
+        "--trace",
+        default=None,
+        help="Write sampled assign/backtrack events of the search to this file as JSON lines"
+    )
+    parser.add_argument(
+        "--trace-sample",
+        type=int,
+        default=1000,
+        help="Write only every N-th search event to --trace (default 1000)"
+    )
+
+    args = parser.parse_args()
+    # With --no-draw, standard output carries only the JSON result and the progress messages go to standard error
+    log = functools.partial(print, file=sys.stderr) if args.no_draw else print
+
+    trace = open(args.trace, "w") if args.trace else None
+    instrumentation = Instrumentation(trace=trace, sample=args.trace_sample) if args.stats or trace else None
+
+    def phase(name):
+        return instrumentation.phase(name) if instrumentation is not None else contextlib.nullcontext()
+
+    max_distance = args.Neighborhood_distance #based on client n
+    with phase("load"):
+        load_dataset()
+    # Countries within max_distance borders of each other must get different colors
+    with phase("graph"):
+        results_dict = neighborhood_graph(str(args.map), max_distance)
+
+    solver_options = dict(domain_heuristics=args.lcv,variable_heuristics=args.mrv,AC_3=args.arc_consistency,
+                          forward_checking=args.forward_checking,MAC=args.maintain_arc_consistency,
+                          DSATUR=args.dsatur,backjumping=args.backjumping,nogood_limit=args.nogoods,
+                          symmetry_breaking=args.symmetry_breaking)
+    # Counters of components solved in worker processes stay in those processes
+    if instrumentation is not None and not (args.components and args.workers):
+        solver_options["instrumentation"] = instrumentation
+    engine = "cbj" if args.backjumping else "iterative" if args.iterative else "backtrack"
+
+    def make_solver(csp):
+        return Solver(csp=csp, **solver_options)
+
+    def solve(csp):
+        # Returns the solution and the statistics to report for the selected search engine
+        if args.portfolio:
+            from portfolio import portfolio_solve
+
+            result, winner, runs = portfolio_solve(csp, restarts=args.restarts, workers=args.workers, time_limit=args.time_limit)
+            for run in sorted(runs, key=lambda run: run["time"]):
+                log("  worker", run["configuration"], "seed:", run["seed"], "solved:", run["solved"], "stopped:", run["stopped"],
+                    "assignments:", run["assignments_number"], "time: %.3fs" % run["time"])
+            if winner is None:
+                log("Search budget exhausted")
+                return None, {"assignments_number": sum(run["assignments_number"] for run in runs), "stopped": True}
+            log("Winning configuration:", winner["configuration"], "seed:", winner["seed"])
+            return result, {"assignments_number": winner["assignments_number"], "stopped": False}
+
+        if args.local_search:
+            search = LocalSearch(csp)
+            result = search.solve(max_iterations=args.max_nodes or 100 * len(csp.variables), time_limit=args.time_limit)
+            if result is None:
+                log("Search budget exhausted, best coloring has", search.best_conflicts, "conflicts")
+            return result, {"assignments_number": csp.assignments_number, "stopped": search.stopped, "conflicts": search.best_conflicts}
+
+        if args.components:
+            result, stats = solve_by_components(csp, solver_options, engine, workers=args.workers, max_nodes=args.max_nodes,
+                                                time_limit=args.time_limit, peeling=args.peeling)
+            log("Components:", stats["components"], " Isolated:", stats["isolated"])
+        elif args.peeling:
+            result, stats = solve_with_peeling(csp, solver_options, engine, max_nodes=args.max_nodes, time_limit=args.time_limit)
+        if args.components or args.peeling:
+            if args.peeling:
+                log("Peeled:", stats["peeled"], "of", len(csp.variables))
+            if stats["stopped"]:
+                log("Search budget exhausted")
+            if not args.backjumping:
+                del stats["backjumps"], stats["nogood_hits"]
+            return result, stats
+
+        solver = make_solver(csp)
+        if args.backjumping:
+            result = solver.cbj_solver(max_nodes=args.max_nodes, time_limit=args.time_limit)
+        elif args.iterative:
+            result = solver.iterative_solver(max_nodes=args.max_nodes, time_limit=args.time_limit)
+        else:
+            result = solver.backtrack_solver()
+        if solver.stopped:
+            log("Search budget exhausted")
+        stats = {"assignments_number": solver.csp.assignments_number, "stopped": solver.stopped}
+        if args.backjumping:
+            stats["backjumps"] = solver.backjumps
+            stats["nogood_hits"] = solver.nogood_hits
+        return result, stats
+
+    if args.min_colors:
+        with phase("search"):
+            colors_number, coloring, min_stats = minimum_colors(results_dict, max_nodes=args.max_nodes)
+        colors = palette(colors_number, not args.no_draw)
+        result = {country: colors[color] for country, color in coloring.items()}
+        log(" minimum needed colors:",colors_number, "(lower bound:", min_stats["lower_bound"], ", DSATUR upper bound:", min_stats["upper_bound"], ")")
+        if not min_stats["proved"]:
+            log("Search budget exhausted, minimality not proved")
+        stats = {"assignments_number": min_stats["nodes"]}
+    elif max_distance == 1:
+        # Create a CSP instance with the generated borders
+        colors_number = 4
+        colors = ["red","blue","green","yellow"]
+        with phase("build"):
+            csp = build_csp(results_dict, colors)
+        # Solve the CSP with the specified heuristic options
+        with phase("search"):
+            result, stats = solve(csp)
     else:
-        countries=list(graph.keys())
-        constraint_func = lambda x,y : x!= y
-        for country in countries:
-                neighbor_removed = []
-                for neighbor in results_dict[country]:
-                    if neighbor not in countries:
-                        neighbor_removed.append(neighbor)
-                    else:
-                        csp.add_constraint(constraint_func,[country,neighbor])
-                        csp.constraints.append((country,neighbor))
-
-                results_dict[country] =[i for i in graph[country] if i not in neighbor_removed]
-         
-        result = None    
+        # Generate colors using a matplotlib color map, adding one color until a solution exists
+        colors_number = num_colors
+        result = None
         while result == None :
-            num_colors +=1
-            for country in countries:
-                csp.add_variable(country,[cmap(i) for i in np.linspace(0, 1, num_colors)])
-                csp.assignments[country] = None
-               
-            solver = Solver(csp=csp,domain_heuristics=args.lcv,variable_heuristics=args.mrv,AC_3=args.arc_consistency)
-            result = solver.backtrack_solver()
-            if result != None :
-                assignments_number = solver.csp.assignments_number
-                finalresult = {}
-                for i in result:
-                    finalresult[i[0]] = i[1]
-                print(" minimum needed colors:",num_colors)
-                draw(solution=finalresult, continent=str(args.map), assignments_number=assignments_number) """
-                
-                
-# Initialize a Solver object with the CSP and specified heuristic options
-solver = Solver(csp=csp,domain_heuristics=args.lcv,variable_heuristics=args.mrv,AC_3=args.arc_consistency)
-    
-# # Solve the CSP
-result = solver.backtrack_solver()
-print(result)
-   
-# Retrieve the number of assignments made during the solving process
-assignments_number = solver.csp.assignments_number
-
-finalresult = {}
-for i in result:
-    finalresult[i[0]] = i[1]
-    
-    draw(solution=result, continent=str(args.map), assignments_number=assignments_number)
-    
+            colors_number +=1
+            with phase("build"):
+                colors = palette(colors_number, not args.no_draw)
+                csp = build_csp(results_dict, colors)
+            with phase("search"):
+                result, stats = solve(csp)
+            # Local search gives up on palettes that are too small, so only a systematic search stops here
+            if stats["stopped"] and not args.local_search:
+                break
+        log(" minimum needed colors:",colors_number)
+
+    # Retrieve the number of assignments made during the solving process
+    assignments_number = stats["assignments_number"]
+    log("Assignment Number:", assignments_number)
+    if "backjumps" in stats:
+        log("Backjumps:", stats["backjumps"], " Nogood hits:", stats["nogood_hits"])
+    if args.count:
+        with phase("count"):
+            stats["solutions"] = count_solutions(build_csp(results_dict, colors), max_nodes=args.max_nodes or 100000,
+                                                 time_limit=args.time_limit)
+        if stats["solutions"] is None:
+            log("Counting budget exhausted")
+        else:
+            log("Number of colorings with", colors_number, "colors:", stats["solutions"])
+
+    if not args.no_draw:
+        with phase("render"):
+            from graphics import draw
+            draw(solution=result, continent=str(args.map), assignments_number=assignments_number, output=args.output)
+
+    if trace is not None:
+        trace.close()
+    if args.no_draw:
+        output = {"map": str(args.map), "distance": max_distance, "colors_number": colors_number, "solved": result is not None,
+                  "assignment": result, **stats}
+        if instrumentation is not None:
+            output.update(instrumentation.as_dict())
+        print(json.dumps(output))
+    elif args.stats == "json":
+        log(json.dumps({**stats, "solved": result is not None, **instrumentation.as_dict()}))
+    elif args.stats == "text":
+        for name, value in instrumentation.as_dict().items():
+            if name != "timers":
+                log("%s: %s" % (name.replace("_", " ").capitalize(), value))
+        for name, seconds in instrumentation.timers.items():
+            log("%s time: %.3fs" % (name.capitalize(), seconds))
+
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,142 @@
+import os
+from array import array
+from typing import Dict, List, Tuple
+from CSP import CSP, not_equal
+from map_generator import generate_borders_by_continent
+
+
+_graph_cache = {}
+
+
+def complete_borders(borders: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """
+    Adds an empty neighbor list for every region that appears only as somebody's neighbor (for example a
+    country of another continent), so that every region is a key.
+
+    Args:
+        borders (dict): Maps each region to its neighbors; modified in place.
+
+    Returns:
+        dict: The same dictionary.
+    """
+    missing = [neighbor for neighbors in borders.values() for neighbor in neighbors if neighbor not in borders]
+    for key in missing:
+        borders[key] = []
+    return borders
+
+
+def to_csr(borders: Dict[str, List[str]]) -> Tuple[List[str], array, array]:
+    """
+    Interns the regions of a borders dictionary and stores the symmetric adjacency in CSR form.
+
+    Args:
+        borders (dict): Maps each region to its neighbors.
+
+    Returns:
+        Tuple[list, array, array]: The region names, the row offsets and the column indices.
+    """
+    names = list(borders)
+    index = {name: i for i, name in enumerate(names)}
+    rows = [set() for _ in names]
+    for name, neighbors in borders.items():
+        i = index[name]
+        for neighbor in neighbors:
+            j = index.get(neighbor)
+            if j is not None and j != i:
+                rows[i].add(j)
+                rows[j].add(i)
+    offsets = array('i', [0])
+    targets = array('i')
+    for row in rows:
+        targets.extend(sorted(row))
+        offsets.append(len(targets))
+    return names, offsets, targets
+
+
+def k_hop_adjacency(borders: Dict[str, List[str]], k: int) -> Dict[str, List[str]]:
+    """
+    Computes, for every region, the regions reachable in at most k borders. A depth-bounded BFS is run from
+    every region over CSR arrays, reusing one visited-stamp array for all sources instead of allocating a set
+    and a queue per country.
+
+    Args:
+        borders (dict): Maps each region to its neighbors.
+        k (int): The neighborhood distance.
+
+    Returns:
+        dict: Maps each region to the regions within distance k, excluding itself.
+    """
+    if k <= 1:
+        return {name: [neighbor for neighbor in neighbors if neighbor in borders and neighbor != name]
+                for name, neighbors in borders.items()}
+
+    names, offsets, targets = to_csr(borders)
+
+    stamp = array('i', [-1]) * len(names)
+    result = {}
+    for source in range(len(names)):
+        stamp[source] = source
+        reached = []
+        frontier = [source]
+        for _ in range(k):
+            next_frontier = []
+            for node in frontier:
+                for j in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[j]
+                    if stamp[neighbor] != source:
+                        stamp[neighbor] = source
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            reached.extend(next_frontier)
+            frontier = next_frontier
+        result[names[source]] = [names[j] for j in reached]
+    return result
+
+
+def neighborhood_graph(continent: str, k: int, dataset: str = './countries_dataset.csv') -> Dict[str, List[str]]:
+    """
+    Returns the distance-k constraint graph of a continent. Results are cached per (dataset, continent, k) for
+    the lifetime of the process; callers must not modify the returned dictionary.
+
+    Args:
+        continent (str): The continent to build the graph for.
+        k (int): The neighborhood distance.
+        dataset (str, optional): Path of the countries CSV file. Defaults to './countries_dataset.csv'.
+
+    Returns:
+        dict: Maps each region to the regions it must get a different color from.
+    """
+    key = (os.path.abspath(dataset), continent, k)
+    if key not in _graph_cache:
+        borders = complete_borders(generate_borders_by_continent(continent=continent, path=dataset))
+        _graph_cache[key] = k_hop_adjacency(borders, k)
+    return _graph_cache[key]
+
+
+def emit_constraints(csp: CSP, adjacency: Dict[str, List[str]]) -> None:
+    """
+    Adds a "different values" constraint for every edge of adjacency directly to the CSP, sharing one constraint
+    function instead of creating a lambda per pair. Both arcs of every edge are appended to csp.constraints.
+
+    Args:
+        csp (CSP): The CSP to extend.
+        adjacency (dict): Maps each variable to the variables it must differ from.
+
+    Returns:
+        None
+    """
+    var_constraints = csp.var_constraints
+    seen = set()
+    for var, neighbors in adjacency.items():
+        for neighbor in neighbors:
+            if neighbor == var or neighbor not in adjacency:
+                continue
+            edge = (var, neighbor) if var < neighbor else (neighbor, var)
+            if edge in seen:
+                continue
+            seen.add(edge)
+            var_constraints.setdefault(var, []).append((not_equal, neighbor))
+            var_constraints.setdefault(neighbor, []).append((not_equal, var))
+            csp.constraints.append((var, neighbor))
+            csp.constraints.append((neighbor, var))
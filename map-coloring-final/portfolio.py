@@ -0,0 +1,115 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Dict, List, Optional, Tuple
+from CSP import CSP
+from Solver import Solver
+
+
+# Solver keyword arguments tried by default, roughly from the cheapest to the strongest propagation
+DEFAULT_CONFIGURATIONS = [
+    {"DSATUR": True, "forward_checking": True},
+    {"DSATUR": True, "MAC": True},
+    {"DSATUR": True, "forward_checking": True, "domain_heuristics": True},
+    {"variable_heuristics": True, "MAC": True, "domain_heuristics": True},
+    {"DSATUR": True, "forward_checking": True, "backjumping": True, "nogood_limit": 1000},
+    {"variable_heuristics": True, "AC_3": True},
+]
+
+_stop_event = None
+
+
+def _init_worker(stop_event) -> None:
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _run_configuration(csp: CSP, index: int, configuration: Dict, seed: Optional[int], time_limit: Optional[float]) -> Dict:
+    """
+    Solves csp with one configuration in a worker process and returns its result and statistics.
+    """
+    if seed is not None:
+        rng = random.Random(seed)
+        for domain in csp.variables.values():
+            rng.shuffle(domain)
+    solver = Solver(csp=csp, **configuration)
+    start = time.perf_counter()
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+
+    def should_stop() -> bool:
+        return _stop_event.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+    if configuration.get("backjumping"):
+        result = solver.cbj_solver(should_stop=should_stop)
+    else:
+        result = solver.iterative_solver(should_stop=should_stop)
+    return {
+        "index": index,
+        "configuration": configuration,
+        "seed": seed,
+        "solved": result is not None,
+        "stopped": solver.stopped,
+        "assignments_number": csp.assignments_number,
+        "backjumps": solver.backjumps,
+        "time": time.perf_counter() - start,
+        "result": dict(result) if result is not None else None,
+    }
+
+
+def portfolio_solve(csp: CSP, configurations: Optional[List[Dict]] = None, restarts: int = 0, workers: Optional[int] = None,
+                    time_limit: Optional[float] = None, seed: int = 0) -> Tuple[Optional[Dict[str, str]], Optional[Dict], List[Dict]]:
+    """
+    Runs several solver configurations in parallel processes and keeps the first one that finishes.
+
+    Every configuration is run once with the domains in their original order and, for each restart, once more
+    with every domain shuffled by a different seed. As soon as one run finds a solution (or proves there is none)
+    the others are told to stop through a shared event; runs that have not started yet are cancelled.
+
+    Args:
+        csp (CSP): The problem to solve. Its constraint functions must be picklable (module-level functions such
+            as CSP.not_equal, not lambdas). It is not modified.
+        configurations (list, optional): Solver keyword arguments for each configuration.
+            Defaults to DEFAULT_CONFIGURATIONS.
+        restarts (int, optional): Number of randomized value orderings per configuration. Defaults to 0.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        time_limit (float, optional): Seconds after which every run gives up. Defaults to no limit.
+        seed (int, optional): Seed of the first randomized restart. Defaults to 0.
+
+    Returns:
+        Tuple[dict, dict, list]: The winning assignments (None if the problem has no solution or nobody finished),
+        the statistics of the winning run, and the statistics of every run that was started.
+    """
+    if configurations is None:
+        configurations = DEFAULT_CONFIGURATIONS
+    jobs = [(index, configuration, None if restart == 0 else seed + restart - 1)
+            for restart in range(restarts + 1) for index, configuration in enumerate(configurations)]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    context = get_context()
+    stop_event = context.Event()
+    winner = None
+    runs = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(stop_event,)) as executor:
+        pending = {executor.submit(_run_configuration, csp, index, configuration, job_seed, time_limit)
+                   for index, configuration, job_seed in jobs}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                run = future.result()
+                runs.append(run)
+                # A run that was not stopped is conclusive, whether it found a solution or proved there is none
+                if winner is None and not run["stopped"]:
+                    winner = run
+                    stop_event.set()
+                    for other in pending:
+                        other.cancel()
+
+    result = winner.pop("result") if winner is not None else None
+    for run in runs:
+        run.pop("result", None)
+    return result, winner, runs
@@ -0,0 +1,317 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+from CSP import CSP
+from Solver import Solver
+from chromatic import minimum_colors
+from components import solve_by_components
+from dataset import DEFAULT_PATH, load_dataset
+from kernel import solve_with_peeling
+from neighborhood import emit_constraints, neighborhood_graph
+
+
+# Solver keyword arguments a request may set; they are part of the cache key
+SOLVER_OPTIONS = ["domain_heuristics", "variable_heuristics", "AC_3", "forward_checking", "MAC", "DSATUR", "backjumping",
+                  "nogood_limit", "symmetry_breaking"]
+
+
+def graph_digest(graph: Dict[Hashable, List[Hashable]]) -> str:
+    """
+    Returns a canonical hash of a constraint graph: the same regions and edges give the same digest whatever the
+    order of the dictionary and of the neighbor lists, and whether every edge is listed once or twice.
+
+    Args:
+        graph (dict): Maps each region to the regions it must differ from.
+
+    Returns:
+        str: The hexadecimal SHA-256 digest.
+    """
+    vertices = sorted(repr(vertex) for vertex in graph)
+    edges = set()
+    for vertex, neighbors in graph.items():
+        a = repr(vertex)
+        for neighbor in neighbors:
+            if neighbor != vertex and neighbor in graph:
+                b = repr(neighbor)
+                edges.add((a, b) if a < b else (b, a))
+    digest = hashlib.sha256()
+    digest.update(json.dumps([vertices, sorted(edges)]).encode())
+    return digest.hexdigest()
+
+
+class SolveService(object):
+    """
+    Long-lived map coloring solver. The dataset, the constraint graphs and their digests stay in memory between
+    requests, and results are memoized in an LRU cache (optionally backed by a directory of pickles) keyed by the
+    graph digest and every option that changes the answer.
+
+    A request is a dictionary:
+        map, distance: A continent of the dataset and the neighborhood distance (default 1), or
+        graph: An explicit constraint graph, mapping each region to its neighbors.
+        colors: The number of colors (default 4), or "min" for the minimum number of colors.
+        options: Solver keyword arguments (see SOLVER_OPTIONS).
+        peeling, components: Solve with kernel.solve_with_peeling or components.solve_by_components.
+        max_nodes, time_limit: Budget of the search; results cut off by the budget are not cached.
+        id: Copied to the response.
+
+    The response contains id, key, cached ("memory", "disk" or false), solved, colors_number, assignment (the
+    color index of every region, or None) and stats.
+
+    Attributes:
+        cache_size (int): Maximum number of results kept in memory.
+        cache_dir (str): Directory of the on-disk tier, or None.
+        counters (dict): Number of requests, memory hits, disk hits and solves.
+    """
+
+    def __init__(self, cache_size: int = 1024, cache_dir: Optional[str] = None, dataset: str = DEFAULT_PATH) -> None:
+        """
+        Initializes a SolveService object and loads the dataset.
+
+        Args:
+            cache_size (int, optional): Maximum number of results kept in memory. Defaults to 1024.
+            cache_dir (str, optional): Directory in which results are also stored, so that they survive restarts.
+                Defaults to no disk tier.
+            dataset (str, optional): Path of the countries CSV file. Defaults to the bundled dataset.
+        """
+        self.cache_size = cache_size
+        self.cache_dir = cache_dir
+        self.dataset = dataset
+        self.cache = OrderedDict()
+        self.digests = {}
+        self.counters = {"requests": 0, "memory_hits": 0, "disk_hits": 0, "solves": 0}
+        load_dataset(dataset)
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+
+    def graph(self, request: Dict) -> Tuple[Dict, str]:
+        """
+        Returns the constraint graph of a request and its digest; the digests of dataset graphs are computed once.
+
+        Raises:
+            ValueError: If the map is not a continent of the dataset.
+        """
+        if "graph" in request:
+            graph = request["graph"]
+            return graph, graph_digest(graph)
+        key = (request["map"], request.get("distance", 1))
+        continents = load_dataset(self.dataset).continents()
+        if key[0] not in continents:
+            raise ValueError("unknown map %r, expected one of %s" % (key[0], ", ".join(continents)))
+        graph = neighborhood_graph(key[0], key[1], self.dataset)
+        if key not in self.digests:
+            self.digests[key] = graph_digest(graph)
+        return graph, self.digests[key]
+
+
+    def request_key(self, request: Dict, digest: str) -> str:
+        """
+        Returns the cache key of a request: the graph digest and the options that change the result.
+        """
+        options = request.get("options", {})
+        unknown = set(options) - set(SOLVER_OPTIONS)
+        if unknown:
+            raise ValueError("unknown solver options: %s" % ", ".join(sorted(unknown)))
+        settings = {"colors": request.get("colors", 4), "options": options, "peeling": bool(request.get("peeling")),
+                    "components": bool(request.get("components"))}
+        return hashlib.sha256((digest + json.dumps(settings, sort_keys=True)).encode()).hexdigest()
+
+
+    def lookup(self, key: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Returns the cached result of a key and the tier it was found in ("memory" or "disk").
+        """
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            return result, "memory"
+        if self.cache_dir is None:
+            return None, None
+        try:
+            with open(os.path.join(self.cache_dir, 'solve-' + key + '.pickle'), 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None, None
+        self.remember(key, result, write=False)
+        return result, "disk"
+
+
+    def remember(self, key: str, result: Dict, write: bool = True) -> None:
+        """
+        Stores a result in the memory cache, evicting the least recently used one, and in the disk tier.
+        """
+        self.cache[key] = result
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        if write and self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, 'solve-' + key + '.pickle')
+            try:
+                with open(path + '.tmp', 'wb') as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + '.tmp', path)
+            except OSError:
+                pass  # The memory tier still has it
+
+
+    def compute(self, graph: Dict, request: Dict) -> Dict:
+        """
+        Solves a request without looking at the cache.
+
+        Returns:
+            dict: solved, colors_number, assignment and stats; stats["stopped"] is True if the budget ran out.
+        """
+        start = time.perf_counter()
+        colors = request.get("colors", 4)
+        max_nodes = request.get("max_nodes")
+        if colors == "min":
+            colors_number, coloring, min_stats = minimum_colors(graph, max_nodes=max_nodes)
+            stats = {"assignments_number": min_stats["nodes"], "stopped": not min_stats["proved"],
+                     "lower_bound": min_stats["lower_bound"], "upper_bound": min_stats["upper_bound"]}
+            result = coloring
+        else:
+            colors_number = int(colors)
+            csp = CSP()
+            emit_constraints(csp, graph)
+            for region in graph:
+                csp.add_variable(region, list(range(colors_number)))
+            options = request.get("options", {})
+            engine = "cbj" if options.get("backjumping") else "iterative"
+            time_limit = request.get("time_limit")
+            if request.get("components"):
+                result, stats = solve_by_components(csp, options, engine, max_nodes=max_nodes, time_limit=time_limit,
+                                                    peeling=bool(request.get("peeling")))
+            elif request.get("peeling"):
+                result, stats = solve_with_peeling(csp, options, engine, max_nodes=max_nodes, time_limit=time_limit)
+            else:
+                solver = Solver(csp=csp, **options)
+                if engine == "cbj":
+                    result = solver.cbj_solver(max_nodes=max_nodes, time_limit=time_limit)
+                else:
+                    result = solver.iterative_solver(max_nodes=max_nodes, time_limit=time_limit)
+                stats = {"assignments_number": csp.assignments_number, "stopped": solver.stopped}
+            if result is not None:
+                result = dict(result)
+        stats["time"] = time.perf_counter() - start
+        return {"solved": result is not None, "colors_number": colors_number, "assignment": result, "stats": stats}
+
+
+    def solve(self, request: Dict) -> Dict:
+        """
+        Answers one request from the cache, or solves it and caches the result unless the budget ran out.
+
+        Args:
+            request (dict): The request (see the class documentation).
+
+        Returns:
+            dict: The response.
+        """
+        self.counters["requests"] += 1
+        graph, digest = self.graph(request)
+        key = self.request_key(request, digest)
+        result, tier = self.lookup(key)
+        if result is None:
+            self.counters["solves"] += 1
+            result = self.compute(graph, request)
+            if not result["stats"]["stopped"]:
+                self.remember(key, result)
+        else:
+            self.counters[tier + "_hits"] += 1
+        return {"id": request.get("id"), "key": key, "cached": tier or False, **result}
+
+
+    def handle(self, message):
+        """
+        Answers a decoded message: a request, a list of requests (a batch, answered with a list), or
+        {"op": "stats"} for the cache counters.
+        """
+        if isinstance(message, list):
+            return [self.handle(request) for request in message]
+        if not isinstance(message, dict):
+            return {"error": "a request must be a JSON object or a list of objects"}
+        if message.get("op") == "stats":
+            return {**self.counters, "cached": len(self.cache), "graphs": len(self.digests)}
+        try:
+            return self.solve(message)
+        except (KeyError, TypeError, ValueError) as error:
+            return {"id": message.get("id"), "error": "%s: %s" % (type(error).__name__, error)}
+
+
+    def handle_line(self, line: str) -> str:
+        """
+        Answers one JSON-lines message with one JSON line (without the newline).
+        """
+        try:
+            message = json.loads(line)
+        except ValueError as error:
+            return json.dumps({"error": "invalid JSON: %s" % error})
+        return json.dumps(self.handle(message), default=str)
+
+
+def serve_stream(service: SolveService, instream=sys.stdin, outstream=sys.stdout) -> None:
+    """
+    Answers JSON-lines requests read from instream until it is closed, flushing every response.
+    """
+    for line in instream:
+        if line.strip():
+            outstream.write(service.handle_line(line) + "\n")
+            outstream.flush()
+
+
+def serve_socket(service: SolveService, path: str) -> None:
+    """
+    Answers JSON-lines requests on a Unix socket. Connections are served one at a time, every line of a
+    connection getting one response line.
+    """
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write((service.handle_line(line.decode()) + "\n").encode())
+                    self.wfile.flush()
+
+    if os.path.exists(path):
+        os.remove(path)
+    with socketserver.UnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.remove(path)
+
+
+def main():
+    """
+    Runs the solve service.
+
+    Command-line arguments:
+    - --socket PATH: Listen on a Unix socket instead of reading standard input.
+    - --cache-size N: Number of results kept in memory (default 1024).
+    - --cache-dir DIR: Also store the results in DIR, so that they survive restarts.
+    - --dataset FILE: The countries CSV file.
+    """
+    parser = argparse.ArgumentParser(prog="Map Coloring service", description="Answers JSON-lines map coloring requests")
+    parser.add_argument("--socket", default=None, help="Unix socket to listen on (default: standard input and output)")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Number of results kept in memory")
+    parser.add_argument("--cache-dir", default=None, help="Directory in which results are also stored")
+    parser.add_argument("--dataset", default=DEFAULT_PATH, help="The countries CSV file")
+    args = parser.parse_args()
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    service = SolveService(cache_size=args.cache_size, cache_dir=args.cache_dir, dataset=args.dataset)
+    if args.socket is None:
+        serve_stream(service)
+    else:
+        serve_socket(service, args.socket)
+
+
+
+if __name__ == '__main__':
+    main()